@@ -9,7 +9,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.server import backend_app
+from backend.server import backend_app, serve_artifact
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,12 +30,15 @@ frontend_app.add_middleware(
 
 # Mount static files
 frontend_app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
-frontend_app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 
 @frontend_app.get("/")
 async def index():
     return FileResponse('frontend/index.html')
 
+@frontend_app.get("/outputs/{path:path}")
+async def outputs(path: str):
+    return serve_artifact(f'outputs/{path}')
+
 @frontend_app.get("/favicon.ico")
 async def favicon():
     return FileResponse('frontend/static/favicon.ico', media_type="image/x-icon")
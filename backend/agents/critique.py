@@ -1,10 +1,12 @@
 from datetime import datetime
 from langchain_community.adapters.openai import convert_openai_messages
 from langchain_openai import ChatOpenAI
+from ..routing import ModelRouter
+from ..structured import parse_critique
 
 class CritiqueAgent:
-    def __init__(self):
-        pass
+    def __init__(self, router: ModelRouter = None):
+        self.router = router or ModelRouter()
 
     def critique(self, article: dict):
         prompt = [{
@@ -24,8 +26,10 @@ class CritiqueAgent:
         }]
 
         lc_messages = convert_openai_messages(prompt)
-        response = ChatOpenAI(model='gpt-4o-mini', max_retries=1).invoke(lc_messages).content
-        if response == 'None':
+        response = parse_critique(self.router.call(
+            "critique", lambda model: ChatOpenAI(model=model, max_retries=1).invoke(lc_messages), query=article.get("query")
+        ).content)
+        if response is None:
             return {'critique': None}
         else:
             print(f"For article: {article['title']}")
@@ -5,13 +5,17 @@ from openai import OpenAI
 import os
 import json
 import logging
+from ..coalesce import DEGRADED
+from ..routing import ModelRouter
+from ..structured import StructuredOutputError, count, parse_url_list, parse_curated_content
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 class CuratorAgent:
-    def __init__(self):
+    def __init__(self, router: ModelRouter = None):
         self.client = OpenAI()
+        self.router = router or ModelRouter()
         logger.info("CuratorAgent initialized")
 
     def curate_sources(self, query: str, sources: list):
@@ -50,22 +54,30 @@ class CuratorAgent:
 
         try:
             lc_messages = convert_openai_messages(prompt)
-            response = ChatOpenAI(model='gpt-4o-mini', max_retries=1).invoke(lc_messages).content
+            response = self.router.call(
+                "curate", lambda model: ChatOpenAI(model=model, max_retries=1).invoke(lc_messages), query=query
+            ).content
             
             # Parse the response and extract URLs
             try:
-                chosen_urls = json.loads(response)
+                chosen_urls = parse_url_list(response)
                 logger.info(f"Selected {len(chosen_urls)} sources from {len(sources)} available")
                 
                 # Filter sources while maintaining order
+                chosen_urls = set(chosen_urls)
                 filtered_sources = [s for s in sources if s["url"] in chosen_urls]
                 logger.info(f"Final number of curated sources: {len(filtered_sources)}")
+                if not filtered_sources:
+                    count("curator.fallback_no_match")
+                    return sources[:10]
                 return filtered_sources
-            except json.JSONDecodeError:
+            except StructuredOutputError:
                 logger.error("Failed to parse curator response as JSON")
+                count("curator.fallback_first_10")
                 return sources[:10]  # Return first 10 sources as fallback
         except Exception as e:
             logger.error(f"Error in source curation: {str(e)}")
+            count("curator.fallback_first_10")
             return sources[:10]  # Return first 10 sources as fallback
 
     def curate_content(self, article: dict):
@@ -98,20 +110,21 @@ class CuratorAgent:
 
         try:
             logger.info("Making API request to OpenAI for content curation")
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = self.router.call("curate", lambda model: self.client.chat.completions.create(
+                model=model,
                 messages=messages,
                 response_format={"type": "json_object"}
-            )
+            ), query=article["query"])
             
-            result = json.loads(response.choices[0].message.content)
+            result = parse_curated_content(response.choices[0].message.content)
             logger.info(f"Content curation completed. Generated title: {result.get('title', 'No title')}")
             logger.debug("Content preview: " + result.get('content', '')[:200] + "...")
             
             return result
         except Exception as e:
             logger.error(f"Error in content curation: {str(e)}")
-            return {"title": "Error", "content": "<p>Failed to generate content.</p>"}
+            count("curator.fallback_error_content")
+            return {"title": "Error", "content": "<p>Failed to generate content.</p>", DEGRADED: True}
 
     def run(self, article: dict):
         logger.info("CuratorAgent running")
@@ -120,5 +133,7 @@ class CuratorAgent:
         result = self.curate_content(article)
         article["title"] = result["title"]
         article["content"] = result["content"]
+        if result.get(DEGRADED):
+            article[DEGRADED] = True
         logger.info("CuratorAgent completed")
         return article
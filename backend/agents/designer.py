@@ -2,8 +2,9 @@ import os
 import re
 
 class DesignerAgent:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, store):
         self.output_dir = output_dir
+        self.store = store
 
 
     def load_html_template(self):
@@ -24,7 +25,8 @@ class DesignerAgent:
         html_template = html_template.replace("{{image}}", image)
         html_template = html_template.replace("{{date}}", date)
         for i in range(5):
-            html_template = html_template.replace(f"{{paragraph{i + 1}}}", paragraphs[i])
+            paragraph = paragraphs[i] if i < len(paragraphs) else ""
+            html_template = html_template.replace(f"{{paragraph{i + 1}}}", paragraph)
         article["html"] = html_template
         article = self.save_article_html(article)
         return article
@@ -33,8 +35,7 @@ class DesignerAgent:
         filename = re.sub(r'[\/:*?"<>| ]', '_', article['query'])
         filename = f"{filename}.html"
         path = os.path.join(self.output_dir, filename)
-        with open(path, 'w') as file:
-            file.write(article['html'])
+        self.store.put_artifact(path, article['html'])
         article["path"] = filename
         return article
 
@@ -1,64 +1,202 @@
 from openai import OpenAI
 import os
+import re
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from ..routing import ModelRouter
+from ..spill import load_value
+from ..structured import parse_intro_outro
+from ..tts_cache import get_audio_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+HOSTS_PROMPT = (
+    "You are writing a script for 'GPT Podcast'. The show has three hosts: Alex (male), Lia (female), and Ray (male). "
+    "Create a natural, engaging conversation between these hosts as they discuss the news. "
+    "Format the script with clear speaker labels (ALEX:, LIA:, RAY:). "
+)
+
+SPEAKER_LABEL = re.compile(r"^\**[A-Z]+\**:")
+
+# Maximum input length of a single speech request
+TTS_MAX_CHARS = 4000
+
 class PodcastAgent:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, store, router: ModelRouter = None):
         self.client = OpenAI()
+        self.router = router or ModelRouter()
         self.output_dir = output_dir
+        self.store = store
+        # "single" writes the whole script in one call, "map_reduce" writes one segment per story in
+        # parallel, "auto" uses map-reduce for editions with three or more stories
+        self.script_mode = os.getenv("PODCAST_SCRIPT_MODE", "auto")
+        self.script_concurrency = int(os.getenv("PODCAST_SCRIPT_CONCURRENCY", "8"))
+        self.key_paragraphs = int(os.getenv("PODCAST_KEY_PARAGRAPHS", "2"))
+        self.max_paragraph_chars = 600
+        self.tts_choice = None       # (tier, model), chosen per episode: HD unless the edition is short on time or budget
+        self.tts_model = None
+        self.voice = "nova"          # Using Nova voice for a natural, engaging tone
+        self.tts_concurrency = int(os.getenv("PODCAST_TTS_CONCURRENCY", "4"))
+        self.audio_cache = get_audio_cache()
         logger.info("PodcastAgent initialized")
 
+    def build_digest(self, articles):
+        """Compact, prompt-sized digest of the articles: title, summary and key paragraphs only"""
+        digest = []
+        for i, article in enumerate(articles, 1):
+            lines = [f"Story {i}: {article.get('title') or article.get('query')}"]
+            if article.get("summary"):
+                lines.append(f"Summary: {article['summary']}")
+            for paragraph in (load_value(self.store, article.get("paragraphs")) or [])[:self.key_paragraphs]:
+                lines.append(f"- {paragraph[:self.max_paragraph_chars]}")
+            digest.append("\n".join(lines))
+        return "\n\n".join(digest)
+
+    def complete(self, messages, **kwargs):
+        response = self.router.call("podcast", lambda model: self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            **kwargs
+        ))
+        return response.choices[0].message.content
+
     def generate_podcast_script(self, articles):
         """Generate an engaging podcast script from the articles"""
         logger.info("Generating podcast script")
         
         prompt = [{
             "role": "system",
-            "content": "You are writing a script for 'GPT Podcast'. The show has three hosts: Alex (male), Lia (female), and Ray (male). "
-                      "Create a natural, engaging conversation between these hosts as they discuss the news. "
-                      "Format the script with clear speaker labels (ALEX:, LIA:, RAY:). Start with a welcome to GPT Podcast. "
+            "content": HOSTS_PROMPT + "Start with a welcome to GPT Podcast. "
                       "Make the conversation dynamic with hosts building on each other's points."
         }, {
             "role": "user",
-            "content": f"Create a podcast script discussing these articles: {str(articles)}\n"
+            "content": f"Create a podcast script discussing these articles:\n{self.build_digest(articles)}\n"
                       f"Start with 'ALEX: Welcome to GPT Podcast!' and maintain a natural conversation flow between the three hosts. "
                       f"Make sure each host contributes roughly equally to the discussion."
         }]
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=prompt,
-                temperature=0.7
-            )
-            script = response.choices[0].message.content
+            script = self.complete(prompt)
             logger.info("Podcast script generated successfully")
             return script
         except Exception as e:
             logger.error(f"Error generating podcast script: {str(e)}")
             return None
 
+    def generate_segment(self, article, index, total):
+        """Generate the discussion of a single story, to be stitched into the full script"""
+        prompt = [{
+            "role": "system",
+            "content": HOSTS_PROMPT + "You are writing one segment of the episode, in the middle of the show: "
+                      "do not welcome the listeners or say goodbye."
+        }, {
+            "role": "user",
+            "content": f"Write the segment for story {index} of {total}:\n{self.build_digest([article])}\n"
+                      f"Open with a short transition into the story and make sure each host contributes."
+        }]
+        try:
+            return self.complete(prompt)
+        except Exception as e:
+            logger.error(f"Error generating podcast segment for {article.get('query')}: {str(e)}")
+            return None
+
+    def generate_intro_outro(self, articles):
+        """Generate the welcome and closing lines of the episode from the story titles"""
+        titles = "\n".join(f"- {a.get('title') or a.get('query')}" for a in articles)
+        prompt = [{
+            "role": "system",
+            "content": HOSTS_PROMPT
+        }, {
+            "role": "user",
+            "content": f"Today's stories are:\n{titles}\n"
+                      f"Write a short intro that starts with 'ALEX: Welcome to GPT Podcast!' and previews the stories, "
+                      f"and a short outro where the hosts wrap up and say goodbye. "
+                      f"Return a JSON object with 'intro' and 'outro' fields."
+        }]
+        try:
+            result = parse_intro_outro(self.complete(prompt, response_format={"type": "json_object"}))
+            return result["intro"], result["outro"]
+        except Exception as e:
+            logger.error(f"Error generating podcast intro/outro: {str(e)}")
+            return "ALEX: Welcome to GPT Podcast!", "ALEX: That's all for today. Thanks for listening to GPT Podcast!"
+
+    def generate_podcast_script_map_reduce(self, articles):
+        """Generate per-story segments in parallel, then stitch them with an intro and outro"""
+        logger.info(f"Generating podcast script from {len(articles)} parallel segments")
+        with ThreadPoolExecutor(max_workers=max(1, min(len(articles) + 1, self.script_concurrency))) as executor:
+            intro_outro = executor.submit(self.generate_intro_outro, articles)
+            segments = list(executor.map(
+                lambda item: self.generate_segment(item[1], item[0] + 1, len(articles)),
+                enumerate(articles)
+            ))
+            intro, outro = intro_outro.result()
+
+        segments = [segment for segment in segments if segment]
+        if not segments:
+            logger.error("Failed to generate any podcast segment")
+            return None
+        logger.info("Podcast script generated successfully")
+        return "\n\n".join([intro] + segments + [outro])
+
+    def split_script(self, script):
+        """Split the script into speaker turns, the unit of synthesis and caching"""
+        segments = []
+        for line in script.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if segments and not SPEAKER_LABEL.match(line):
+                segments[-1] += " " + line
+            else:
+                segments.append(line)
+        # Keep every request under the TTS input limit
+        chunks = []
+        for segment in segments:
+            while len(segment) > TTS_MAX_CHARS:
+                cut = segment.rfind(". ", 0, TTS_MAX_CHARS) + 1 or TTS_MAX_CHARS
+                chunks.append(segment[:cut])
+                segment = segment[cut:].strip()
+            chunks.append(segment)
+        return chunks
+
+    def synthesize(self, text):
+        response = self.router.call("tts", lambda model: self.client.audio.speech.create(
+            model=model,
+            voice=self.voice,
+            input=text
+        ), characters=len(text), choice=self.tts_choice)
+        return response.content
+
     def create_audio(self, script):
-        """Convert the script to audio using OpenAI's TTS"""
+        """Convert the script to audio using OpenAI's TTS, synthesizing only segments not in the cache"""
         logger.info("Converting script to audio")
         
         try:
             # Create audio file path
             audio_file_path = Path(self.output_dir) / "podcast.mp3"
-            
-            # Generate speech using OpenAI's TTS
-            response = self.client.audio.speech.create(
-                model="tts-1-hd",  # Using HD model for better quality
-                voice="nova",      # Using Nova voice for a natural, engaging tone
-                input=script
-            )
-            
-            # Save the audio file
-            response.stream_to_file(str(audio_file_path))
+
+            # One voice model for the whole episode, so that segments sound alike
+            self.tts_choice = self.router.choose("tts")
+            self.tts_model = self.tts_choice[1]
+            segments = self.split_script(script)
+            keys = [self.audio_cache.key(segment, self.voice, self.tts_model) for segment in segments]
+            audio = {key: self.audio_cache.get(key) for key in set(keys)}
+            missing = {key: segment for key, segment in zip(keys, segments) if audio[key] is None}
+            logger.info(f"TTS cache: {len(segments) - len(missing)} of {len(segments)} segments cached, "
+                        f"synthesizing {len(missing)}")
+
+            # Generate speech for the new segments using OpenAI's TTS
+            if missing:
+                with ThreadPoolExecutor(max_workers=self.tts_concurrency) as executor:
+                    for key, data in zip(missing, executor.map(self.synthesize, missing.values())):
+                        self.audio_cache.put(key, data)
+                        audio[key] = data
+
+            # Save the audio file; MP3 frames can be concatenated as-is
+            self.store.put_artifact(str(audio_file_path), b"".join(audio[key] for key in keys))
             
             logger.info(f"Audio generated and saved to {audio_file_path}")
             return str(audio_file_path)
@@ -72,7 +210,10 @@ class PodcastAgent:
         
         try:
             # Generate podcast script
-            script = self.generate_podcast_script(articles)
+            if self.script_mode == "map_reduce" or (self.script_mode == "auto" and len(articles) >= 3):
+                script = self.generate_podcast_script_map_reduce(articles)
+            else:
+                script = self.generate_podcast_script(articles)
             if not script:
                 logger.error("Failed to generate podcast script")
                 return None
@@ -2,14 +2,13 @@ import os
 
 
 class PublisherAgent:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, store):
         self.output_dir = output_dir
+        self.store = store
 
     def save_newspaper_html(self, newspaper_html):
         path = os.path.join(self.output_dir, "newspaper.html")
-        with open(path, 'w') as file:
-            file.write(newspaper_html)
-        return path
+        return self.store.put_artifact(path, newspaper_html)
 
     def run(self, newspaper_html: str):
         newspaper_path = self.save_newspaper_html(newspaper_html)
@@ -1,24 +1,46 @@
 from openai import OpenAI
 import os
-import json
+import time
 import logging
+import threading
+from concurrent.futures import Future, TimeoutError
 from langchain_community.adapters.openai import convert_openai_messages
 from langchain_openai import ChatOpenAI
-from datetime import datetime
+from ..coalesce import DEGRADED
+from ..routing import ModelRouter
+from ..structured import StructuredOutputError, count, parse_search_results
+from ..source_index import get_source_index
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+DEFAULT_IMAGE = "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+
 class SearchAgent:
-    def __init__(self):
+    def __init__(self, router: ModelRouter = None):
+        self.router = router or ModelRouter()
         self.perplexity_client = OpenAI(
-            api_key="<API KEY>",
-            base_url="https://api.perplexity.ai"
+            api_key=os.getenv("PERPLEXITY_API_KEY"),
+            base_url=os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
         )
+        self.source_index = get_source_index()
+        # How long to wait for the live search when the local index already has enough fresh sources.
+        # With fewer local hits the live search is always waited for.
+        self.deadline = float(os.getenv("NEWSPAPER_SEARCH_DEADLINE", "5"))
+        self.min_local_hits = int(os.getenv("NEWSPAPER_SOURCE_INDEX_MIN_HITS", "5"))
+        self.max_local_age_days = float(os.getenv("NEWSPAPER_SOURCE_INDEX_MAX_AGE_DAYS", "7"))
         logger.info("SearchAgent initialized")
 
-    def extract_json_from_response(self, content: str):
-        """Use GPT-4 mini to extract JSON from the response"""
+    def extract_json_from_response(self, content: str, query: str = None):
+        """Parse the search results locally, and only use GPT-4 mini to extract them if that fails"""
+        try:
+            results = parse_search_results(content)
+            if results:
+                count("search.local_extract")
+                return {'results': results}
+        except StructuredOutputError as e:
+            logger.info(f"Local extraction failed, falling back to LLM extraction: {str(e)}")
+
         prompt = [{
             "role": "system",
             "content": "You are a JSON extractor. Your task is to find and extract only the JSON object from the given text. "
@@ -30,30 +52,16 @@ class SearchAgent:
         }]
 
         try:
+            count("search.llm_extract")
             lc_messages = convert_openai_messages(prompt)
             optional_params = {
                 "response_format": {"type": "json_object"}
             }
-            response = ChatOpenAI(model='gpt-4o-mini', max_retries=1, model_kwargs=optional_params).invoke(lc_messages).content
-            extracted = json.loads(response)
-            
-            # Validate the structure
-            if 'results' not in extracted or not isinstance(extracted['results'], list):
-                logger.error("Invalid JSON structure: missing 'results' array")
-                return {'results': []}
-                
-            # Validate each result
-            valid_results = []
-            for result in extracted['results']:
-                if all(k in result for k in ['url', 'title', 'snippet']):
-                    # Ensure there's a date, even if approximate
-                    if 'date' not in result:
-                        result['date'] = datetime.now().strftime('%Y-%m-%d')
-                    valid_results.append(result)
-                else:
-                    logger.warning(f"Skipping invalid result: {result}")
-            
-            return {'results': valid_results}
+            response = self.router.call(
+                "extract", lambda model: ChatOpenAI(model=model, max_retries=1, model_kwargs=optional_params).invoke(lc_messages),
+                query=query
+            ).content
+            return {'results': parse_search_results(response)}
         except Exception as e:
             logger.error(f"Error extracting JSON: {str(e)}")
             return {'results': []}
@@ -86,24 +94,24 @@ class SearchAgent:
 
         try:
             logger.info("Making API request to Perplexity")
-            response = self.perplexity_client.chat.completions.create(
-                model="sonar-reasoning-pro",  
+            response = self.router.call("search", lambda model: self.perplexity_client.chat.completions.create(
+                model=model,
                 messages=messages
-            )
+            ), query=query)
             
             try:
                 if not hasattr(response, 'choices') or not response.choices:
                     logger.error("No choices in Perplexity response")
-                    return [], "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+                    return [], DEFAULT_IMAGE
                 
                 content = response.choices[0].message.content
                 logger.debug(f"Raw Perplexity response: {content}")
                 
                 if not content:
                     logger.error("Empty content from Perplexity")
-                    return [], "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+                    return [], DEFAULT_IMAGE
                 
-                results = self.extract_json_from_response(content)
+                results = self.extract_json_from_response(content, query)
                 sources = results.get('results', [])
                 
                 if not sources:
@@ -113,23 +121,77 @@ class SearchAgent:
                     logger.debug(f"First few results: {sources[:3]}")
                 
                 # Use a default image if no specific image is available
-                image = "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+                image = DEFAULT_IMAGE
                 
                 return sources, image
                 
             except Exception as e:
                 logger.error(f"Failed to extract JSON: {str(e)}")
                 logger.debug(f"Raw response content: {content if 'content' in locals() else 'No content available'}")
-                return [], "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+                return [], DEFAULT_IMAGE
                 
         except Exception as e:
             logger.error(f"Error in Perplexity search: {str(e)}")
-            return [], "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1000"
+            return [], DEFAULT_IMAGE
+
+    def live_search(self, query: str, future: Future):
+        try:
+            sources, image = self.search_perplexity(query)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result((sources, image))
+        # Indexing is best effort: the live results are already served even if it fails
+        if self.source_index is not None and sources:
+            try:
+                self.source_index.add(query, sources)
+            except Exception as e:
+                logger.error(f"Error indexing sources for '{query}': {str(e)}")
+
+    def search(self, query: str):
+        """
+        Search with the local source index and Perplexity together: fresh local hits are merged
+        with the live results, or, when there are enough of them, served alone if the live search
+        misses its (short) deadline. Returns (sources, image, live), where live tells whether the
+        live search contributed any sources.
+        """
+        if self.source_index is None:
+            sources, image = self.search_perplexity(query)
+            return sources, image, bool(sources)
+
+        start = time.perf_counter()
+        live = Future()
+        # The live search keeps running (and indexing) even if we stop waiting for it
+        threading.Thread(target=self.live_search, args=(query, live), daemon=True).start()
+
+        try:
+            local = self.source_index.search(query, max_age_days=self.max_local_age_days)
+        except Exception as e:
+            logger.error(f"Error searching local source index: {str(e)}")
+            local = []
+        if local:
+            logger.info(f"Found {len(local)} local sources for '{query}' in {time.perf_counter() - start:.2f}s")
+
+        try:
+            sources, image = live.result(timeout=self.deadline if len(local) >= self.min_local_hits else None)
+        except TimeoutError:
+            logger.warning(f"Live search for '{query}' passed its {self.deadline}s deadline, using local sources only")
+            count("search.local_only")
+            return local, DEFAULT_IMAGE, False
+
+        live_urls = {s["url"] for s in sources}
+        extra = [s for s in local if s["url"] not in live_urls]
+        if extra:
+            count("search.local_merged")
+        return sources + extra, image, bool(sources)
 
     def run(self, article: dict):
         logger.info(f"SearchAgent running for topic: {article['query']}")
-        res = self.search_perplexity(article["query"])
+        res = self.search(article["query"])
         article["sources"] = res[0]
         article["image"] = res[1]
+        if not res[2]:
+            # Failed or late live search: later editions should search again rather than reuse this
+            article[DEGRADED] = True
         logger.info(f"SearchAgent completed. Found {len(article['sources'])} sources")
         return article
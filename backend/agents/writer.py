@@ -1,7 +1,8 @@
 from datetime import datetime
 from langchain_community.adapters.openai import convert_openai_messages
 from langchain_openai import ChatOpenAI
-import json5 as json
+from ..routing import ModelRouter
+from ..structured import parse_draft, parse_revision
 
 sample_json = """
 {
@@ -33,8 +34,8 @@ sample_revise_json = """
 
 
 class WriterAgent:
-    def __init__(self):
-        pass
+    def __init__(self, router: ModelRouter = None):
+        self.router = router or ModelRouter()
 
     def writer(self, query: str, sources: list):
 
@@ -59,8 +60,11 @@ class WriterAgent:
             "response_format": {"type": "json_object"}
         }
 
-        response = ChatOpenAI(model='gpt-4o-mini', max_retries=1, model_kwargs=optional_params).invoke(lc_messages).content
-        return json.loads(response)
+        response = self.router.call(
+            "write", lambda model: ChatOpenAI(model=model, max_retries=1, model_kwargs=optional_params).invoke(lc_messages),
+            query=query
+        ).content
+        return parse_draft(response)
 
     def revise(self, article: dict):
         prompt = [{
@@ -83,8 +87,11 @@ class WriterAgent:
             "response_format": {"type": "json_object"}
         }
 
-        response = ChatOpenAI(model='gpt-4o-mini', max_retries=1, model_kwargs=optional_params).invoke(lc_messages).content
-        response = json.loads(response)
+        response = self.router.call(
+            "write", lambda model: ChatOpenAI(model=model, max_retries=1, model_kwargs=optional_params).invoke(lc_messages),
+            query=article.get("query")
+        ).content
+        response = parse_revision(response)
         print(f"For article: {article['title']}")
         print(f"Writer Revision Message: {response['message']}\n")
         return response
@@ -0,0 +1,153 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Set by a stage on a result built from a fallback (e.g. a failed upstream call). Such results are
+# shared with callers already waiting on the call, but not kept for later ones, which retry instead.
+DEGRADED = "degraded"
+
+# State fields that do not affect a stage's output and are left out of its key
+UNKEYED_FIELDS = ["speculation"]
+
+
+def normalize_topic(query: str) -> str:
+    """Normalize a topic so that e.g. 'AI', ' ai ' and 'Ai' are treated as the same topic"""
+    return " ".join(query.casefold().split())
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """
+    Singleflight-style request coalescing.
+
+    Concurrent callers of do() with the same key share one in-flight computation, and callers
+    arriving within the freshness window after it finished get its result without recomputing it.
+    Every caller receives its own copy of the result. Failures, and results the caller does not
+    want retained, are shared with the callers that were waiting on them but are never cached.
+    """
+
+    def __init__(self, freshness_seconds: float):
+        self.freshness_seconds = freshness_seconds
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        expired = [
+            key for key, call in self._calls.items()
+            if call.done.is_set() and now - call.finished_at >= self.freshness_seconds
+        ]
+        for key in expired:
+            del self._calls[key]
+
+    def do(self, key, fn, retain=None):
+        """
+        Return fn() for this key, sharing the computation with concurrent callers. Returns (result, shared).
+        retain(result) decides whether the result is kept for callers arriving after it finished.
+        """
+        with self._lock:
+            self._prune(time.monotonic())
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                call.finished_at = time.monotonic()
+                with self._lock:
+                    if call.error is not None or self.freshness_seconds <= 0 or \
+                            (retain is not None and not retain(call.result)):
+                        self._calls.pop(key, None)
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result), not leader
+
+
+# Process-wide coalescing of topic pipeline stages across concurrent editions
+stage_flights = SingleFlight(float(os.getenv("NEWSPAPER_COALESCE_SECONDS", "300")))
+
+
+def stage_key(stage: str, state: dict, model: str = None) -> str:
+    """Key a stage call by its name, the model it is routed to, the normalized topic and the rest of its input state"""
+    # Spilled fields are identified by their content, not by the run directory they were written to
+    state = {
+        k: v["sha256"] if isinstance(v, dict) and "$ref" in v else v
+        for k, v in state.items() if k not in UNKEYED_FIELDS
+    }
+    state["query"] = normalize_topic(state["query"])
+    fingerprint = hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{stage}:{model or ''}:{state['query']}:{fingerprint}"
+
+
+def stored(stage: str, key: str, fn, store):
+    """
+    Compute fn() unless a fresh result for the key is in the shared store, and keep a new
+    (non-degraded) result there, so workers in other processes can use it
+    """
+    freshness = stage_flights.freshness_seconds
+    try:
+        result = store.get_stage_result(key, freshness)
+    except Exception as e:
+        logger.warning(f"Could not look up stored {stage} result: {str(e)}")
+        result = None
+    if result is not None:
+        logger.info(f"Using a {stage} result stored by an earlier edition or prefetch")
+        return result
+    result = fn()
+    if not result.get(DEGRADED):
+        try:
+            store.put_stage_result(key, result, freshness)
+        except Exception as e:
+            logger.warning(f"Could not store {stage} result: {str(e)}")
+    return result
+
+
+def coalesced(stage: str, fn, router=None, store=None):
+    """
+    Wrap a graph node so identical concurrent calls for the same topic share one computation.
+    With a model router, only calls routed to the same model for the stage are shared, so e.g.
+    an urgent edition's fast-tier draft is never served to an edition that gets the quality tier.
+    With a store, fresh results are also shared with other processes through the store.
+    """
+    def run(state: dict):
+        query = state["query"]
+        model = router.choose(stage)[1] if router is not None else None
+        key = stage_key(stage, state, model)
+
+        def compute():
+            if store is not None and stage_flights.freshness_seconds > 0:
+                return stored(stage, key, lambda: fn(dict(state)), store)
+            return fn(dict(state))
+
+        result, shared = stage_flights.do(key, compute, retain=lambda result: not result.get(DEGRADED))
+        if shared:
+            logger.info(f"Coalesced {stage} for topic '{query}' with an in-flight or fresh request")
+        if result.pop(DEGRADED, False):
+            logger.warning(f"{stage} for topic '{query}' fell back to a degraded result, not keeping it")
+        # Keep the caller's spelling of the topic (used e.g. for the article filename)
+        result["query"] = query
+        return result
+    return run
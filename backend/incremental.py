@@ -0,0 +1,75 @@
+import os
+import logging
+from datetime import datetime
+
+from .spill import load_value
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fields of a previous article that are carried over when its sources did not change. The date is
+# not: it dates this edition (the editor takes the masthead date from the first article).
+REUSED_FIELDS = ["title", "paragraphs", "summary", "image"]
+
+
+def source_urls(sources: list) -> set:
+    """Fingerprint a curated source set by its normalized URLs"""
+    return {s["url"].strip().rstrip("/").lower() for s in sources or [] if s.get("url")}
+
+
+def source_difference(previous: list, current: list) -> float:
+    """Fraction of the combined source set that is not shared by both editions (0 = identical)"""
+    previous_urls, current_urls = source_urls(previous), source_urls(current)
+    union = previous_urls | current_urls
+    if not union:
+        return 1.0
+    return 1 - len(previous_urls & current_urls) / len(union)
+
+
+class IncrementalAgent:
+    """
+    Reuse the previous edition's article for a topic when its curated sources barely changed,
+    so that only topics with new sources go through write and critique again.
+    """
+
+    def __init__(self, store, designer_agent, run_id: str, enabled: bool = False):
+        self.store = store
+        self.designer_agent = designer_agent
+        self.run_id = run_id
+        self.enabled = enabled
+        self.threshold = float(os.getenv("NEWSPAPER_INCREMENTAL_THRESHOLD", "0.2"))
+
+    def reuse_previous(self, article: dict):
+        previous = self.store.find_latest_result(article["query"], exclude_job_id=self.run_id)
+        if previous is None:
+            logger.info(f"No previous edition for topic: {article['query']}")
+            return article
+        job_id, previous_article = previous
+        if not previous_article.get("paragraphs"):
+            return article
+
+        previous_sources = load_value(self.store, previous_article.get("sources"))
+        difference = source_difference(previous_sources, article.get("sources"))
+        if difference >= self.threshold:
+            logger.info(f"Sources for '{article['query']}' changed by {difference:.0%}, rewriting article")
+            return article
+
+        logger.info(f"Sources for '{article['query']}' changed by {difference:.0%}, reusing article from {job_id}")
+        for field in REUSED_FIELDS:
+            article[field] = previous_article.get(field)
+        article["date"] = datetime.now().strftime('%d/%m/%Y')
+        article["reused_from"] = job_id
+
+        # Copy the previously rendered article page into this run, if it is still available
+        html = None
+        if previous_article.get("path"):
+            html = self.store.get_artifact(os.path.join("outputs", job_id, previous_article["path"]))
+        if html is not None:
+            article["html"] = html.decode()
+            article = self.designer_agent.save_article_html(article)
+        return article
+
+    def run(self, article: dict):
+        if self.enabled:
+            article = self.reuse_previous(article)
+        return article
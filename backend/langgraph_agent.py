@@ -1,12 +1,21 @@
 import os
 import time
+import uuid
+import socket
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List, Optional, Dict, Any
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
 
 # Import agent classes
 from .agents import SearchAgent, CuratorAgent, WriterAgent, DesignerAgent, EditorAgent, PublisherAgent, CritiqueAgent, PodcastAgent
+from .coalesce import coalesced
+from .incremental import IncrementalAgent
+from .routing import ModelRouter, summarize as summarize_models
+from .spill import lean
+from .speculation import SpeculativeDesign, summarize as summarize_speculation
+from .store import BaseStore, LeaseRenewal, get_store, DONE, FAILED
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -24,50 +33,86 @@ class AgentState(TypedDict):
     message: Optional[str]
     path: Optional[str]
     podcast: Optional[Dict[str, str]]
+    reused_from: Optional[str]
+    critique: Optional[str]
+    critique_rounds: Optional[int]
+    designed: Optional[bool]
+    speculation: Optional[Dict[str, float]]
 
 class MasterAgent:
-    def __init__(self):
+    def __init__(self, run_id: str = None, store: BaseStore = None, incremental: bool = False,
+                 router: ModelRouter = None):
         logger.info("Initializing MasterAgent")
-        self.output_dir = f"outputs/run_{int(time.time())}"
-        os.makedirs(self.output_dir, exist_ok=True)
-        logger.info(f"Created output directory: {self.output_dir}")
+        self.store = store or get_store()
+        self.incremental = incremental
+        self.router = router or ModelRouter.from_env()
+        self.speculative = os.getenv("NEWSPAPER_SPECULATIVE_DESIGN", "1") == "1"
+        # Critique-driven revision rounds per article. 0 keeps the original flow: one critique, no revision
+        self.max_revisions = int(os.getenv("NEWSPAPER_MAX_REVISIONS", "0"))
+        self.spill_state = os.getenv("NEWSPAPER_SPILL_STATE", "1") == "1"
+        self.run_id = run_id or f"run_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        self.output_dir = f"outputs/{self.run_id}"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._chain = None
+        logger.info(f"Using output directory: {self.output_dir}")
 
-    def run(self, queries: list, layout: str):
-        logger.info(f"Starting newspaper generation for queries: {queries}")
-        logger.info(f"Using layout: {layout}")
+    def build_chain(self):
+        """Compile the per-topic search -> curate -> (reuse | write -> critique) -> design workflow"""
+        if self._chain is not None:
+            return self._chain
 
         # Initialize agents
         logger.info("Initializing agents...")
-        search_agent = SearchAgent()
-        curator_agent = CuratorAgent()
-        writer_agent = WriterAgent()
-        critique_agent = CritiqueAgent()
-        designer_agent = DesignerAgent(self.output_dir)
-        editor_agent = EditorAgent(layout)
-        publisher_agent = PublisherAgent(self.output_dir)
-        podcast_agent = PodcastAgent(self.output_dir)
-        logger.info("All agents initialized successfully")
+        writer_agent = WriterAgent(self.router)
+        critique_agent = CritiqueAgent(self.router)
+        designer_agent = DesignerAgent(self.output_dir, self.store)
+        incremental_agent = IncrementalAgent(self.store, designer_agent, self.run_id, enabled=self.incremental)
+        logger.info("Topic agents initialized successfully")
 
         # Define a Langchain graph
         logger.info("Setting up workflow graph")
         workflow = StateGraph(AgentState)
 
-        # Add nodes for each agent
-        workflow.add_node("search_step", search_agent.run)
-        workflow.add_node("curate_step", curator_agent.run)
-        workflow.add_node("write_step", writer_agent.run)
-        workflow.add_node("critique_step", critique_agent.run)
-        workflow.add_node("design_step", designer_agent.run)
+        # Add nodes for each agent. The LLM stages are coalesced so that concurrent editions asking
+        # for the same topic share one computation; design writes into this run's directory.
+        # Heavy fields are spilled to the run directory and each node only loads those it needs.
+        design = self.lean(designer_agent.run, needs=["paragraphs"])
+        for name, step in self.prefetch_steps():
+            workflow.add_node(name, step)
+        workflow.add_node("incremental_step", self.lean(incremental_agent.run, needs=["sources"]))
+        workflow.add_node("write_step", coalesced("write", self.lean(writer_agent.run, needs=["sources", "paragraphs"]), self.router))
+        workflow.add_node("critique_step", self.critique_step(
+            coalesced("critique", self.lean(critique_agent.run, needs=["sources", "paragraphs"]), self.router), design
+        ))
+        workflow.add_node("design_step", design)
 
         # Set up edges
         workflow.add_edge('search_step', 'curate_step')
-        workflow.add_edge('curate_step', 'write_step')
+        workflow.add_edge('curate_step', 'incremental_step')
         workflow.add_edge('write_step', 'critique_step')
 
+        # In incremental mode, topics whose sources barely changed reuse the previous article
+        def decide_reuse(state: AgentState) -> str:
+            if not state.get('reused_from'):
+                return "write"
+            return "done" if state.get('path') else "design"
+
+        workflow.add_conditional_edges(
+            "incremental_step",
+            decide_reuse,
+            {
+                "write": "write_step",
+                "design": "design_step",
+                "done": END
+            }
+        )
+
         # Define the conditional logic
         def decide_next_step(state: AgentState) -> str:
-            result = "accept" if state.get('critique_result') is None else "revise"
+            result = "accept" if self.accepts(state) else "revise"
             logger.info(f"Critique decision: {result}")
+            if result == "accept" and state.get('designed'):
+                return "done"
             return result
 
         # Add conditional edges with the new syntax
@@ -76,7 +121,8 @@ class MasterAgent:
             decide_next_step,
             {
                 "accept": "design_step",
-                "revise": "write_step"
+                "revise": "write_step",
+                "done": END
             }
         )
 
@@ -86,28 +132,163 @@ class MasterAgent:
 
         # compile the graph
         logger.info("Compiling workflow graph")
-        chain = workflow.compile()
+        self._chain = workflow.compile()
+        return self._chain
+
+    def lean(self, node, needs: list = ()):
+        if not self.spill_state:
+            return node
+        return lean(self.store, self.output_dir, node, needs)
+
+    def accepts(self, article: dict) -> bool:
+        """A draft is final when the critique has no feedback or the revision cap has been reached"""
+        return article.get("critique") is None or article["critique_rounds"] > self.max_revisions
+
+    def critique_step(self, critique, design):
+        """Critique node; in speculative mode the draft is designed while the critique runs"""
+        def run(article: dict):
+            article = critique(article)
+            article["critique_rounds"] = (article.get("critique_rounds") or 0) + 1
+            return article
+
+        if self.speculative:
+            return SpeculativeDesign(run, design, self.accepts).run
+        return run
+
+    def prefetch_steps(self) -> list:
+        """
+        The search and curate nodes. Topic prefetching runs these same coalesced nodes, so that a
+        later edition for the topic attaches to the prefetched results instead of recomputing them.
+        Their results are also kept in the shared store, for editions generated by another worker.
+        """
+        search_agent = SearchAgent(self.router)
+        curator_agent = CuratorAgent(self.router)
+        return [
+            ("search_step", coalesced("search", self.lean(search_agent.run), self.router, self.store)),
+            ("curate_step", coalesced("curate", self.lean(curator_agent.run, needs=["sources"]), self.router, self.store)),
+        ]
 
-        # Execute the graph for each query in parallel
+    def initial_state(self, query: str) -> dict:
+        return {
+            "query": query,
+            "sources": None,
+            "image": None,
+            "title": None,
+            "date": None,
+            "paragraphs": None,
+            "summary": None,
+            "critique_result": None,
+            "message": None,
+            "path": None,
+            "podcast": None,
+            "reused_from": None,
+            "critique": None,
+            "critique_rounds": 0,
+            "designed": None,
+            "speculation": None
+        }
+
+    def run_topic(self, query: str) -> dict:
+        """Run the topic workflow for a single query"""
+        return self.build_chain().invoke(self.initial_state(query))
+
+    def process_task(self, task: dict):
+        """Run a claimed topic task and record its result (or failure) in the store"""
+        logger.info(f"Processing topic task {task['id']} ({task['query']}) for {task['job_id']}")
+        try:
+            # Keep the claim alive, so long-running topics are not handed to another worker
+            with LeaseRenewal(self.store, task):
+                result = self.run_topic(task["query"])
+        except Exception as e:
+            logger.error(f"Topic task {task['id']} failed: {str(e)}")
+            self.router.take_calls(task["query"])
+            if not self.record_task(self.store.fail_task, task, str(e)):
+                logger.warning(f"Topic task {task['id']} was not marked failed, it is retried once its lease expires")
+            return
+        # Models this topic was routed to and their timings (stages shared with another edition are not included)
+        result["models"] = self.router.take_calls(task["query"])
+        if not self.record_task(self.store.complete_task, task, result):
+            logger.warning(f"Topic task {task['id']} result was not recorded, it is retried once its lease expires")
+
+    def record_task(self, record, task: dict, outcome, attempts: int = 3) -> bool:
+        """Record a task's result or failure, retrying transient store errors (e.g. a locked database)"""
+        for attempt in range(1, attempts + 1):
+            try:
+                if record(task, outcome):
+                    return True
+                logger.warning(f"Topic task {task['id']} was claimed by another worker")
+                return False
+            except Exception as e:
+                logger.error(f"Error recording topic task {task['id']} (attempt {attempt}/{attempts}): {str(e)}")
+                time.sleep(attempt)
+        return False
+
+    def process_topics(self):
+        """Claim and process this run's topic tasks until none are pending"""
+        worker_id = f"{self.worker_id}:{threading.get_ident()}"
+        while True:
+            try:
+                task = self.store.claim_task(worker_id, job_id=self.run_id)
+            except Exception as e:
+                # wait_for_topics keeps polling and claims again
+                logger.error(f"Error claiming topic task for {self.run_id}: {str(e)}")
+                return
+            if task is None:
+                return
+            self.process_task(task)
+
+    def wait_for_topics(self, poll_interval: float = 0.5) -> list:
+        """Wait until every topic task of this run is finished, wherever it is being processed"""
+        while True:
+            tasks = self.store.get_tasks(self.run_id)
+            failed = [t for t in tasks if t["status"] == FAILED]
+            if failed:
+                raise RuntimeError(f"Topic '{failed[0]['query']}' failed: {failed[0]['error']}")
+            if all(t["status"] == DONE for t in tasks):
+                return self.store.get_results(self.run_id)
+            # Pick up tasks handed back to the queue by workers that went away
+            self.process_topics()
+            time.sleep(poll_interval)
+
+    def run(self, queries: list, layout: str):
+        logger.info(f"Starting newspaper generation for queries: {queries}")
+        logger.info(f"Using layout: {layout}")
+
+        self.store.create_job(
+            self.run_id, queries, layout, incremental=self.incremental, urgent=self.router.urgent,
+            latency_budget=self.router.latency_budget, cost_budget=self.router.cost_budget
+        )
+        self.router.bind(self.store, self.run_id)
+        try:
+            newspaper_path = self.generate(queries, layout)
+        except Exception as e:
+            self.store.update_job(self.run_id, status="failed", error=str(e))
+            raise
+        self.store.update_job(self.run_id, status="done", path=newspaper_path)
+        return newspaper_path
+
+    def generate(self, queries: list, layout: str):
+        editor_agent = EditorAgent(layout)
+        publisher_agent = PublisherAgent(self.output_dir, self.store)
+        podcast_agent = PodcastAgent(self.output_dir, self.store, self.router)
+
+        # Queue one task per topic in the shared store. This process works through them in
+        # parallel, and workers in other processes claim topics from the same queue.
+        self.store.enqueue_topics(self.run_id, queries)
         logger.info("Starting parallel processing of topics")
-        with ThreadPoolExecutor() as executor:
-            parallel_results = list(executor.map(
-                lambda q: chain.invoke({
-                    "query": q, 
-                    "sources": None, 
-                    "image": None, 
-                    "title": None, 
-                    "date": None, 
-                    "paragraphs": None, 
-                    "summary": None, 
-                    "critique_result": None, 
-                    "message": None, 
-                    "path": None,
-                    "podcast": None
-                }), 
-                queries
-            ))
+        max_workers = int(os.getenv("NEWSPAPER_TOPIC_THREADS", "0")) or min(32, (os.cpu_count() or 1) + 4)
+        local_workers = max(1, min(len(queries), max_workers))
+        with ThreadPoolExecutor(max_workers=local_workers) as executor:
+            futures = [executor.submit(self.process_topics) for _ in range(local_workers)]
+        for future in futures:
+            if future.exception() is not None:
+                logger.error(f"Topic processing thread failed: {str(future.exception())}")
+        parallel_results = self.wait_for_topics()
         logger.info("Completed parallel processing of topics")
+        if self.speculative:
+            speculation = summarize_speculation(parallel_results)
+            logger.info(f"Speculative design: {speculation}")
+            self.store.update_job(self.run_id, speculation=speculation)
 
         # Compile the final newspaper
         logger.info("Compiling final newspaper")
@@ -125,6 +306,12 @@ class MasterAgent:
         else:
             logger.error("Failed to generate podcast")
 
+        # Record which models every stage was routed to, with their timings and cost
+        calls = [call for result in parallel_results for call in result.get("models") or []]
+        models = summarize_models(calls + self.router.take_calls())
+        logger.info(f"Model routing: {models}")
+        self.store.update_job(self.run_id, models=models)
+
         return newspaper_path
 
     def add_audio_player_to_html(self, html: str, audio_path: str) -> str:
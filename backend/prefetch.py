@@ -0,0 +1,152 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .coalesce import normalize_topic, stage_flights
+from .routing import ModelRouter
+from .langgraph_agent import MasterAgent
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Prefetch states
+QUEUED = "queued"
+RUNNING = "running"
+READY = "ready"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class Prefetch:
+    def __init__(self, client_id: str, query: str, routing: dict = None):
+        self.client_id = client_id
+        self.query = query
+        # Budgets and urgency of the edition the topic is for; stages are only shared when routed alike
+        self.routing = routing or {}
+        self.cancelled = threading.Event()
+        self.future = None
+        self.stage = None
+        self.status = QUEUED
+        self.error = None
+        self.finished_at = None
+
+    def finish(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        self.stage = None
+        self.finished_at = time.monotonic()
+
+    def describe(self) -> dict:
+        return {"topic": self.query, "status": self.status, "stage": self.stage, "error": self.error}
+
+
+class Prefetcher:
+    """
+    Speculatively run search and curation for topics while they are being entered in the form.
+
+    Prefetches go through the same coalesced stages as the topic workflow, so an edition that is
+    generated within the coalescing window attaches to the warm (or still running) results. The
+    finished results are also kept in the shared store, so the edition can be generated by any
+    worker. Each client may have a limited number of prefetches running at once.
+    """
+
+    def __init__(self, threads: int = 4, per_client: int = 5):
+        self.per_client = per_client
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="prefetch")
+        self._prefetches = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        # Prefetched results are only useful for as long as the coalesced stages keep them
+        expired = [
+            key for key, prefetch in self._prefetches.items()
+            if prefetch.finished_at is not None and now - prefetch.finished_at >= stage_flights.freshness_seconds
+        ]
+        for key in expired:
+            del self._prefetches[key]
+
+    def start(self, client_id: str, query: str, routing: dict = None):
+        """
+        Start prefetching a topic for a client, routed like an edition with the given latency_budget,
+        cost_budget and urgent flag. Returns its state, or None when the client is at its cap
+        """
+        key = (client_id, normalize_topic(query))
+        with self._lock:
+            self._prune(time.monotonic())
+            prefetch = self._prefetches.get(key)
+            if prefetch is not None and prefetch.status not in (CANCELLED, FAILED):
+                return prefetch.describe()
+            active = [
+                p for (client, _), p in self._prefetches.items()
+                if client == client_id and p.status in (QUEUED, RUNNING)
+            ]
+            if len(active) >= self.per_client:
+                logger.info(f"Client {client_id} has {len(active)} prefetches running, not prefetching '{query}'")
+                return None
+            prefetch = Prefetch(client_id, query, routing)
+            self._prefetches[key] = prefetch
+            prefetch.future = self.executor.submit(self._run, prefetch)
+        logger.info(f"Prefetching topic '{query}' for client {client_id}")
+        return prefetch.describe()
+
+    def cancel(self, client_id: str, query: str) -> bool:
+        """
+        Cancel a client's prefetch. A queued prefetch never starts; a running one stops after its
+        current stage (the request in flight is not aborted and still warms the coalesced stage).
+        """
+        with self._lock:
+            prefetch = self._prefetches.pop((client_id, normalize_topic(query)), None)
+        if prefetch is None:
+            return False
+        prefetch.cancelled.set()
+        if prefetch.future.cancel():
+            prefetch.finish(CANCELLED)
+        logger.info(f"Cancelled prefetch of '{query}' for client {client_id}")
+        return True
+
+    def status(self, client_id: str) -> list:
+        with self._lock:
+            self._prune(time.monotonic())
+            return [p.describe() for (client, _), p in self._prefetches.items() if client == client_id]
+
+    def _run(self, prefetch: Prefetch):
+        prefetch.status = RUNNING
+        try:
+            agent = MasterAgent(
+                run_id=f"prefetch_{int(time.time())}_{uuid.uuid4().hex[:8]}",
+                router=ModelRouter.from_env(**prefetch.routing)
+            )
+            state = agent.initial_state(prefetch.query)
+            for name, step in agent.prefetch_steps():
+                if prefetch.cancelled.is_set():
+                    prefetch.finish(CANCELLED)
+                    return
+                prefetch.stage = name
+                state = step(state)
+        except Exception as e:
+            logger.error(f"Prefetch of '{prefetch.query}' failed: {str(e)}")
+            prefetch.finish(FAILED, str(e))
+            return
+        prefetch.finish(CANCELLED if prefetch.cancelled.is_set() else READY)
+        logger.info(f"Prefetched topic '{prefetch.query}' for client {prefetch.client_id}: {prefetch.status}")
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Return the process-wide prefetcher, or None when disabled with NEWSPAPER_PREFETCH=0"""
+    global _prefetcher
+    if os.getenv("NEWSPAPER_PREFETCH", "1") != "1":
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(
+                threads=int(os.getenv("NEWSPAPER_PREFETCH_THREADS", "4")),
+                per_client=int(os.getenv("NEWSPAPER_PREFETCH_PER_CLIENT", "5"))
+            )
+        return _prefetcher
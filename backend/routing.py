@@ -0,0 +1,265 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+
+from langchain_community.callbacks import get_openai_callback
+
+from .coalesce import normalize_topic
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+QUALITY = "quality"
+
+# Pipeline stages in order, with their fast and quality model and the share of the edition's
+# latency/cost budget they may use. The quality tier is what every stage used before routing.
+# Each model can be overridden with NEWSPAPER_MODEL_<STAGE>_<TIER>, e.g. NEWSPAPER_MODEL_WRITE_FAST.
+STAGES = {
+    "search": {FAST: "sonar", QUALITY: "sonar-reasoning-pro", "share": 0.3},
+    "extract": {FAST: "gpt-4.1-nano", QUALITY: "gpt-4o-mini", "share": 0.0},
+    "curate": {FAST: "gpt-4.1-nano", QUALITY: "gpt-4o-mini", "share": 0.1},
+    "write": {FAST: "gpt-4.1-nano", QUALITY: "gpt-4o-mini", "share": 0.2},
+    "critique": {FAST: "gpt-4.1-nano", QUALITY: "gpt-4o-mini", "share": 0.1},
+    "podcast": {FAST: "gpt-4o-mini", QUALITY: "gpt-4-turbo-preview", "share": 0.2},
+    "tts": {FAST: "tts-1", QUALITY: "tts-1-hd", "share": 0.1},
+}
+
+# Approximate USD per million input and output tokens (per million characters for TTS)
+PRICES = {
+    "sonar": (1.0, 1.0),
+    "sonar-reasoning-pro": (2.0, 8.0),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4-turbo-preview": (10.0, 30.0),
+    "tts-1": (15.0, 0.0),
+    "tts-1-hd": (30.0, 0.0),
+}
+
+# Seconds per call assumed for a model until its latency has been observed
+LATENCY_PRIORS = {
+    "sonar": 4.0,
+    "sonar-reasoning-pro": 20.0,
+    "gpt-4.1-nano": 2.0,
+    "gpt-4o-mini": 5.0,
+    "gpt-4o": 8.0,
+    "gpt-4-turbo-preview": 25.0,
+    "tts-1": 3.0,
+    "tts-1-hd": 6.0,
+}
+
+# Tokens (characters for TTS) per call assumed for a model until its cost has been observed
+USAGE_PRIOR = (3000, 800)
+
+
+def stage_model(stage: str, tier: str) -> str:
+    return os.getenv(f"NEWSPAPER_MODEL_{stage.upper()}_{tier.upper()}", STAGES[stage][tier])
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int = 0) -> float:
+    input_price, output_price = PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def usage(response, callback=None):
+    """
+    (input, output) tokens of a LangChain message or OpenAI completion, or None if not reported.
+    LangChain messages of the pinned langchain-openai carry no usage; it is then taken from the
+    OpenAI callback the call ran under.
+    """
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata:
+        return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+    reported = getattr(response, "usage", None)
+    if reported is not None and getattr(reported, "prompt_tokens", None) is not None:
+        return reported.prompt_tokens, reported.completion_tokens or 0
+    if callback is not None and callback.successful_requests:
+        return callback.prompt_tokens, callback.completion_tokens
+    return None
+
+
+class ModelStats:
+    """Exponentially weighted per-model latency and cost per call, observed across editions"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._latency = {}
+        self._cost = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float, cost: float = None):
+        with self._lock:
+            for values, value in ((self._latency, seconds), (self._cost, cost)):
+                if value is None:
+                    continue
+                previous = values.get(model)
+                values[model] = value if previous is None else previous + self.alpha * (value - previous)
+
+    def latency(self, model: str) -> float:
+        with self._lock:
+            return self._latency.get(model, LATENCY_PRIORS.get(model, 10.0))
+
+    def cost(self, model: str) -> float:
+        with self._lock:
+            cost = self._cost.get(model)
+        return cost if cost is not None else estimate_cost(model, *USAGE_PRIOR)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {model: {"latency_s": round(latency, 3), "cost_usd": round(self._cost.get(model, 0.0), 6)}
+                    for model, latency in self._latency.items()}
+
+
+# Process-wide observations shared by every edition's router
+model_stats = ModelStats()
+
+
+class ModelRouter:
+    """
+    Pick the fast or quality model for each stage of one edition.
+
+    Every stage may use the quality tier as long as the edition stays within its latency and cost
+    budgets: each stage has a cumulative share of both, and when the expected latency (or cost)
+    of the quality model would take the edition past its share, e.g. because an earlier stage
+    fell behind, the fast model is used instead. Urgent editions use the fast tier throughout.
+    Without budgets every stage uses its quality model.
+
+    A router bound to the edition's job keeps the spend on the job in the store, so the cost
+    budget covers the calls of every worker processing the edition's topics.
+    """
+
+    def __init__(self, latency_budget: float = None, cost_budget: float = None, urgent: bool = False,
+                 started_at: float = None, stats: ModelStats = None):
+        self.latency_budget = latency_budget or None
+        self.cost_budget = cost_budget or None
+        self.urgent = urgent
+        self.started_at = started_at or time.time()
+        self.stats = stats or model_stats
+        self.spent = 0.0
+        self.store = None
+        self.job_id = None
+        self._calls = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, latency_budget: float = None, cost_budget: float = None, urgent: bool = False):
+        """Route a new edition, with NEWSPAPER_LATENCY_BUDGET / NEWSPAPER_COST_BUDGET as default budgets"""
+        if latency_budget is None:
+            latency_budget = float(os.getenv("NEWSPAPER_LATENCY_BUDGET", "0"))
+        if cost_budget is None:
+            cost_budget = float(os.getenv("NEWSPAPER_COST_BUDGET", "0"))
+        return cls(latency_budget, cost_budget, urgent)
+
+    @classmethod
+    def for_job(cls, job: dict, store=None):
+        """Route with the budgets an edition was created with, measured from its creation"""
+        router = cls(job.get("latency_budget"), job.get("cost_budget"), job.get("urgent", False), job.get("created_at"))
+        if store is not None and job.get("id"):
+            router.bind(store, job["id"])
+        return router
+
+    def bind(self, store, job_id: str):
+        """Keep the edition's spend as spent_usd on its job in the store"""
+        self.store = store
+        self.job_id = job_id
+        return self
+
+    def edition_spent(self) -> float:
+        """USD spent on the edition so far, by every worker if the router is bound to its job"""
+        if self.store is not None:
+            try:
+                job = self.store.get_job(self.job_id)
+                if job is not None:
+                    return job.get("spent_usd") or 0.0
+            except Exception as e:
+                logger.warning(f"Could not read the spend of {self.job_id}, using this worker's: {str(e)}")
+        with self._lock:
+            return self.spent
+
+    def _share(self, stage: str) -> float:
+        share = 0.0
+        for name, config in STAGES.items():
+            share += config["share"]
+            if name == stage:
+                return share
+        return 1.0
+
+    def choose(self, stage: str) -> tuple:
+        """Return (tier, model) for the next call of a stage"""
+        quality = stage_model(stage, QUALITY)
+        if self.urgent:
+            return FAST, stage_model(stage, FAST)
+        share = self._share(stage)
+        if self.latency_budget is not None:
+            deadline = self.started_at + self.latency_budget * share
+            if time.time() + self.stats.latency(quality) > deadline:
+                return FAST, stage_model(stage, FAST)
+        if self.cost_budget is not None:
+            if self.edition_spent() + self.stats.cost(quality) > self.cost_budget * share:
+                return FAST, stage_model(stage, FAST)
+        return QUALITY, quality
+
+    def call(self, stage: str, fn, query: str = None, characters: int = None, choice: tuple = None):
+        """
+        Call fn(model) with the model chosen for the stage (or a (tier, model) choice made earlier),
+        and record the model, its latency and cost
+        """
+        tier, model = choice or self.choose(stage)
+        start = time.monotonic()
+        error = None
+        response = None
+        callback = None
+        try:
+            with get_openai_callback() as callback:
+                response = fn(model)
+            return response
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            seconds = time.monotonic() - start
+            tokens = (characters, 0) if characters is not None else usage(response, callback)
+            cost = estimate_cost(model, *tokens) if tokens and error is None else None
+            self.record(stage, tier, model, seconds, cost, query, error)
+
+    def record(self, stage: str, tier: str, model: str, seconds: float, cost: float = None,
+               query: str = None, error: str = None):
+        """Record a call; cost is None when the provider did not report usage"""
+        self.stats.observe(model, seconds, cost)
+        with self._lock:
+            self.spent += cost or 0.0
+            self._calls.append({
+                "stage": stage, "tier": tier, "model": model, "seconds": round(seconds, 3),
+                "cost_usd": round(cost or 0.0, 6), "query": query, "error": error
+            })
+        if cost and self.store is not None:
+            try:
+                self.store.add_to_job(self.job_id, spent_usd=cost)
+            except Exception as e:
+                logger.error(f"Error adding {stage} cost to {self.job_id}: {str(e)}")
+        logger.info(f"{stage} used {model} ({tier}) for {seconds:.1f}s" + (f" on '{query}'" if query else ""))
+
+    def take_calls(self, query: str = None) -> list:
+        """Remove and return the recorded calls for a topic (or the edition-level calls if query is None)"""
+        topic = normalize_topic(query) if query is not None else None
+        taken, kept = [], []
+        with self._lock:
+            for call in self._calls:
+                matches = (normalize_topic(call["query"]) if call["query"] else None) == topic
+                (taken if matches else kept).append(call)
+            self._calls = kept
+        return taken
+
+
+def summarize(calls: list) -> dict:
+    """Total calls, seconds and cost per stage and model"""
+    summary = defaultdict(dict)
+    for call in calls:
+        totals = summary[call["stage"]].setdefault(call["model"], {"calls": 0, "seconds": 0.0, "cost_usd": 0.0})
+        totals["calls"] += 1
+        totals["seconds"] = round(totals["seconds"] + call["seconds"], 3)
+        totals["cost_usd"] = round(totals["cost_usd"] + call["cost_usd"], 6)
+    return dict(summary)
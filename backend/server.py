@@ -1,11 +1,18 @@
 import os
+import re
 import logging
 import traceback
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from backend.langgraph_agent import MasterAgent
+from backend.store import get_store
+from backend.prefetch import get_prefetcher
+from backend.routing import ModelRouter, model_stats
+from backend import structured
+from backend.worker import TopicWorker
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +45,35 @@ backend_app.add_middleware(
 class NewspaperRequest(BaseModel):
     topics: List[str]
     layout: str
+    incremental: bool = False
+    # Edition budgets for model routing (defaults from NEWSPAPER_LATENCY_BUDGET / NEWSPAPER_COST_BUDGET)
+    latency_budget: Optional[float] = None
+    cost_budget: Optional[float] = None
+    urgent: bool = False
+
+class PrefetchRequest(BaseModel):
+    topic: str
+    client_id: str
+    # Routing of the edition the topic is for, as in NewspaperRequest
+    latency_budget: Optional[float] = None
+    cost_budget: Optional[float] = None
+    urgent: bool = False
+
+# Background topic workers claiming tasks from the shared queue (disabled by default)
+topic_worker = None
+
+@backend_app.on_event("startup")
+async def start_topic_worker():
+    global topic_worker
+    threads = int(os.getenv("NEWSPAPER_WORKER_THREADS", "0"))
+    if threads > 0:
+        topic_worker = TopicWorker(threads)
+        topic_worker.start()
+
+@backend_app.on_event("shutdown")
+async def stop_topic_worker():
+    if topic_worker is not None:
+        topic_worker.stop()
 
 @backend_app.get("/")
 async def index():
@@ -46,15 +82,18 @@ async def index():
     return {"status": "Running"}
 
 @backend_app.post("/generate_newspaper")
-async def generate_newspaper(request: NewspaperRequest):
+def generate_newspaper(request: NewspaperRequest):
     """
-    Generate a newspaper based on provided topics and layout
+    Generate a newspaper based on provided topics and layout.
+    A plain def, so FastAPI runs the blocking pipeline in its threadpool and the event loop keeps
+    serving job status, outputs, prefetches and other editions meanwhile.
     """
     try:
         logger.info(f"Generate newspaper endpoint called with data: {request.dict()}")
         
         # Initialize master agent
-        master_agent = MasterAgent()
+        router = ModelRouter.from_env(request.latency_budget, request.cost_budget, request.urgent)
+        master_agent = MasterAgent(incremental=request.incremental, router=router)
         logger.info("MasterAgent initialized")
         
         # Process topics and generate newspaper
@@ -62,13 +101,98 @@ async def generate_newspaper(request: NewspaperRequest):
         newspaper_path = master_agent.run(request.topics, request.layout)
         logger.info(f"Generated newspaper at path: {newspaper_path}")
         
-        return {"status": "success", "path": newspaper_path}
+        return {"status": "success", "path": newspaper_path, "job_id": master_agent.run_id}
         
     except Exception as e:
         logger.error(f"Error generating newspaper: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@backend_app.post("/prefetch")
+async def prefetch_topic(request: PrefetchRequest):
+    """
+    Start searching and curating a topic while the user is still filling in the form
+    """
+    prefetcher = get_prefetcher()
+    if prefetcher is None or not request.topic.strip():
+        return {"status": "disabled"}
+    routing = {"latency_budget": request.latency_budget, "cost_budget": request.cost_budget, "urgent": request.urgent}
+    prefetch = prefetcher.start(request.client_id, request.topic.strip(), routing)
+    if prefetch is None:
+        raise HTTPException(status_code=429, detail="Too many topics being prefetched for this client")
+    return prefetch
+
+@backend_app.post("/prefetch/cancel")
+async def cancel_prefetch(request: PrefetchRequest):
+    """
+    Cancel a topic prefetch, e.g. when the topic was edited or removed from the form
+    """
+    prefetcher = get_prefetcher()
+    cancelled = prefetcher is not None and prefetcher.cancel(request.client_id, request.topic.strip())
+    return {"status": "cancelled" if cancelled else "not_found"}
+
+@backend_app.get("/prefetch/{client_id}")
+async def get_prefetches(client_id: str):
+    """
+    Get the state of a client's topic prefetches
+    """
+    prefetcher = get_prefetcher()
+    return {"prefetches": prefetcher.status(client_id) if prefetcher is not None else []}
+
+@backend_app.get("/metrics")
+async def metrics():
+    """
+    Per-process counters, e.g. how often agent responses needed a parse fallback or repair,
+    and the observed latency and cost per call of each model
+    """
+    return {"structured_output": structured.counts(), "models": model_stats.snapshot()}
+
+@backend_app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status of a newspaper job and its finished topics, from any worker
+    """
+    store = get_store()
+    job = store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job["tasks"] = store.get_tasks(job_id)
+    job["results"] = [
+        {"query": r.get("query"), "title": r.get("title"), "summary": r.get("summary"), "path": r.get("path")}
+        for r in store.get_results(job_id)
+    ]
+    return job
+
+@backend_app.get("/outputs/{path:path}")
+def get_output(path: str):
+    """
+    Serve a generated artifact (newspaper, article or podcast) from the shared store
+    """
+    return serve_artifact(f"{OUTPUTS_DIR}/{path}")
+
+# Only the pages and podcast of generated editions are served, never the store databases or caches
+OUTPUTS_DIR = "outputs"
+ARTIFACT_PATH = re.compile(r"^run_[\w-]+/[^/]+\.(?:html|mp3)$")
+
+def serve_artifact(path: str):
+    outputs_dir = os.path.realpath(OUTPUTS_DIR)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([outputs_dir, resolved]) != outputs_dir:
+        raise HTTPException(status_code=404, detail="Not found")
+    relative = os.path.relpath(resolved, outputs_dir).replace(os.sep, "/")
+    if not ARTIFACT_PATH.match(relative):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = f"{OUTPUTS_DIR}/{relative}"
+    store = get_store()
+    local_path = store.local_path(path)
+    if local_path:
+        return FileResponse(local_path)
+    data = store.get_artifact(path)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    media_type = "audio/mpeg" if path.endswith(".mp3") else "text/html"
+    return Response(content=data, media_type=media_type)
+
 # Log all registered routes
 logger.info("Registered Routes:")
 for route in backend_app.routes:
@@ -0,0 +1,138 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Words that say nothing about a topic and would otherwise match every indexed source
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "how", "in", "is", "it", "its",
+    "latest", "new", "news", "of", "on", "or", "the", "this", "to", "today", "what", "with"
+}
+
+
+
+def query_terms(text: str) -> list:
+    """Distinct, meaningful terms of a query: no stopwords and no single characters"""
+    terms = []
+    for term in re.findall(r"\w+", text.lower()):
+        if len(term) > 1 and term not in STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class SourceIndex:
+    """
+    Local full-text index (SQLite FTS5) of every source the search agent has seen.
+
+    Sources are ranked by BM25 over title, snippet and topic, weighted by recency, so fresh
+    sources retrieved for related topics can be served without waiting for a live search.
+    """
+
+    def __init__(self, db_path: str, half_life_days: float = 2.0):
+        self.db_path = db_path
+        self.half_life_days = half_life_days
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._connection().executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS sources USING fts5(
+                url UNINDEXED, title, snippet, topic, date UNINDEXED, seen_at UNINDEXED
+            );
+        """)
+        logger.info(f"SourceIndex initialized at {db_path}")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, topic: str, sources: list):
+        """Index (or refresh) sources retrieved for a topic"""
+        now = time.time()
+        rows = [
+            (s["url"], s.get("title", ""), s.get("snippet", ""), topic, s.get("date", ""), now)
+            for s in sources if s.get("url")
+        ]
+        if not rows:
+            return
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM sources WHERE url = ?", [(row[0],) for row in rows])
+            conn.executemany(
+                "INSERT INTO sources (url, title, snippet, topic, date, seen_at) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _age_days(self, row, now: float) -> float:
+        try:
+            published = datetime.strptime(row["date"], "%Y-%m-%d").timestamp()
+        except (TypeError, ValueError):
+            published = float(row["seen_at"])
+        return max(now - published, 0) / 86400
+
+    def search(self, query: str, limit: int = 20, max_age_days: float = 7.0) -> list:
+        """Return fresh indexed sources that contain most of the query's terms, best first"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        # A source must contain at least two thirds of the terms (all of them for one or two terms)
+        min_matched = len(terms) - len(terms) // 3
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT url, title, snippet, topic, date, seen_at, bm25(sources, 0.0, 2.0, 1.0, 1.0) AS rank "
+            "FROM sources WHERE sources MATCH ? AND seen_at >= ? ORDER BY rank LIMIT ?",
+            (match, now - max_age_days * 86400, limit * 5)
+        ).fetchall()
+
+        scored = []
+        for row in rows:
+            words = set(re.findall(r"\w+", f"{row['title']} {row['snippet']} {row['topic']}".lower()))
+            if sum(term in words for term in terms) < min_matched:
+                continue
+            age = self._age_days(row, now)
+            if age > max_age_days:
+                continue
+            # bm25() is lower for better matches; turn it into a positive relevance and decay it with age
+            score = -row["rank"] * 0.5 ** (age / self.half_life_days)
+            scored.append((score, {"url": row["url"], "title": row["title"], "snippet": row["snippet"], "date": row["date"]}))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [source for _, source in scored[:limit]]
+
+
+_index = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+
+def get_source_index():
+    """
+    Return the process-wide source index, or None when disabled with NEWSPAPER_SOURCE_INDEX=0 or
+    when it cannot be opened (e.g. SQLite built without FTS5), in which case searches go live only
+    """
+    global _index, _index_failed
+    if os.getenv("NEWSPAPER_SOURCE_INDEX", "1") != "1":
+        return None
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = SourceIndex(os.getenv("NEWSPAPER_SOURCE_INDEX_PATH", "outputs/sources.db"))
+            except Exception as e:
+                _index_failed = True
+                logger.warning(f"Source index disabled, could not open it: {str(e)}")
+        return _index
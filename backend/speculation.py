@@ -0,0 +1,60 @@
+import time
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeDesign:
+    """
+    Run the design step for the current draft while its critique is still in flight.
+
+    Most drafts are accepted, so the speculative design is usually committed and design drops
+    off the topic's critical path. When the draft is not accepted, i.e. it goes back for a revision,
+    the speculative result is discarded. Each topic records what was committed, discarded, saved
+    and wasted.
+    """
+
+    def __init__(self, critique, design, accepts=None):
+        self.critique = critique
+        self.design = design
+        # Must agree with the graph's accept/revise decision
+        self.accepts = accepts or (lambda article: article.get("critique") is None)
+
+    def run(self, article: dict):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = time.perf_counter()
+            speculative = executor.submit(self.timed_design, copy.deepcopy(article))
+            article = self.critique(article)
+            critique_time = time.perf_counter() - start
+            designed, design_time = speculative.result()
+
+        stats = dict(article.get("speculation") or {"committed": 0, "discarded": 0, "saved_s": 0.0, "wasted_s": 0.0})
+        if self.accepts(article):
+            # Accepted: the speculatively designed page is the final one
+            article["path"] = designed["path"]
+            article["designed"] = True
+            stats["committed"] += 1
+            stats["saved_s"] += min(design_time, critique_time)
+            logger.info(f"Committed speculative design for '{article['query']}', saved {min(design_time, critique_time):.3f}s")
+        else:
+            stats["discarded"] += 1
+            stats["wasted_s"] += design_time
+            logger.info(f"Discarded speculative design for '{article['query']}', wasted {design_time:.3f}s")
+        article["speculation"] = stats
+        return article
+
+    def timed_design(self, article: dict):
+        start = time.perf_counter()
+        return self.design(article), time.perf_counter() - start
+
+
+def summarize(results: list) -> dict:
+    """Aggregate per-topic speculation stats of an edition"""
+    total = {"committed": 0, "discarded": 0, "saved_s": 0.0, "wasted_s": 0.0}
+    for result in results:
+        for key, value in (result.get("speculation") or {}).items():
+            total[key] += value
+    return total
@@ -0,0 +1,51 @@
+import os
+import json
+import hashlib
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Large AgentState fields that are kept on disk and referenced by handle between stages
+HEAVY_FIELDS = ["sources", "paragraphs"]
+
+
+def is_handle(value) -> bool:
+    return isinstance(value, dict) and "$ref" in value
+
+
+def spill_value(store, output_dir: str, field: str, value):
+    """Write a field's value to the run directory and return a handle to it"""
+    data = json.dumps(value)
+    digest = hashlib.sha256(data.encode()).hexdigest()
+    path = os.path.join(output_dir, "state", f"{field}-{digest}.json")
+    if store.local_path(path) is None:
+        store.put_artifact(path, data)
+    return {"$ref": path, "sha256": digest}
+
+
+def load_value(store, value):
+    """Resolve a handle to its value; plain values are returned as they are"""
+    if not is_handle(value):
+        return value
+    data = store.get_artifact(value["$ref"])
+    if data is None:
+        raise FileNotFoundError(f"Spilled state not found: {value['$ref']}")
+    return json.loads(data)
+
+
+def lean(store, output_dir: str, node, needs: list = ()):
+    """
+    Wrap a graph node so that it only sees the heavy fields it needs, loaded from disk, and
+    every heavy field it produces is spilled to the run directory before the state moves on.
+    """
+    def run(article: dict):
+        article = dict(article)
+        for field in needs:
+            article[field] = load_value(store, article.get(field))
+        article = node(article)
+        for field in HEAVY_FIELDS:
+            if article.get(field) is not None and not is_handle(article[field]):
+                article[field] = spill_value(store, output_dir, field, article[field])
+        return article
+    return run
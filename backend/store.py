@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from .coalesce import normalize_topic
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Task states in the shared topic queue
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+
+class BaseStore:
+    """
+    Shared job state, per-topic results, artifacts and topic task queue.
+
+    Every backend worker (uvicorn worker, container or node) talks to the same store, so a job
+    started on one worker can be processed, inspected and served from any other. Implementations
+    must be safe to use from several threads and processes at once.
+    """
+
+    # Seconds a claimed task may go without a renewal before it is handed to another worker
+    lease_seconds = 900
+
+    # Jobs
+    def create_job(self, job_id: str, topics: list, layout: str, **fields):
+        raise NotImplementedError
+
+    def update_job(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def add_to_job(self, job_id: str, **amounts):
+        """Atomically add to numeric job fields (e.g. spent_usd) updated by several workers"""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str):
+        raise NotImplementedError
+
+    # Per-topic results
+    def save_result(self, job_id: str, index: int, result: dict):
+        raise NotImplementedError
+
+    def get_results(self, job_id: str) -> list:
+        raise NotImplementedError
+
+    def find_latest_result(self, query: str, exclude_job_id: str = None):
+        """Return (job_id, result) of the most recent result for the same normalized topic, or None"""
+        raise NotImplementedError
+
+    # Topic task queue
+    def enqueue_topics(self, job_id: str, topics: list):
+        raise NotImplementedError
+
+    def claim_task(self, worker_id: str, job_id: str = None):
+        """Atomically claim the oldest pending task (optionally for one job), or return None"""
+        raise NotImplementedError
+
+    def renew_task(self, task: dict) -> bool:
+        """Extend the lease of a claimed task; False if the caller no longer holds the claim"""
+        raise NotImplementedError
+
+    def complete_task(self, task: dict, result: dict) -> bool:
+        """Save the result and mark the task done, only if the caller still holds the claim"""
+        raise NotImplementedError
+
+    def fail_task(self, task: dict, error: str) -> bool:
+        """Mark the task failed, only if the caller still holds the claim"""
+        raise NotImplementedError
+
+    def get_tasks(self, job_id: str) -> list:
+        raise NotImplementedError
+
+    # Stage results shared between workers (e.g. prefetched search and curation)
+    def put_stage_result(self, key: str, result: dict, keep_seconds: float):
+        """Store a stage result under its coalescing key, dropping results older than keep_seconds"""
+        raise NotImplementedError
+
+    def get_stage_result(self, key: str, max_age: float):
+        """Return the stage result stored under the key within the last max_age seconds, or None"""
+        raise NotImplementedError
+
+    # Artifacts
+    def put_artifact(self, path: str, data) -> str:
+        """Store an artifact under its output path (e.g. outputs/run_x/newspaper.html)"""
+        raise NotImplementedError
+
+    def get_artifact(self, path: str):
+        raise NotImplementedError
+
+    def local_path(self, path: str):
+        """Return a local file path for the artifact if it lives on disk, otherwise None"""
+        return None
+
+
+class SQLiteStore(BaseStore):
+    """
+    Default store: job state, results and the task queue in a SQLite database, artifacts on the
+    filesystem. Several processes on one host (or hosts sharing a volume) can use it concurrently.
+    """
+
+    def __init__(self, db_path: str = "outputs/store.db", lease_seconds: int = 900):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_tables()
+        logger.info(f"SQLiteStore initialized at {db_path}")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_tables(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                layout TEXT,
+                topics TEXT NOT NULL,
+                data TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS results_topic ON results (topic, created_at);
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                claimed_at REAL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+            CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id);
+            CREATE TABLE IF NOT EXISTS stage_results (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+
+    def _job_from_row(self, row):
+        job = json.loads(row["data"])
+        job.update({
+            "id": row["id"],
+            "status": row["status"],
+            "layout": row["layout"],
+            "topics": json.loads(row["topics"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        })
+        return job
+
+    def create_job(self, job_id: str, topics: list, layout: str, **fields):
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, status, layout, topics, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, "running", layout, json.dumps(topics), json.dumps(fields), now, now)
+        )
+
+    def update_job(self, job_id: str, **fields):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            status = fields.pop("status", row["status"])
+            data = json.loads(row["data"])
+            data.update(fields)
+            conn.execute(
+                "UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(data), time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_to_job(self, job_id: str, **amounts):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            data = json.loads(row["data"])
+            for field, amount in amounts.items():
+                data[field] = (data.get(field) or 0) + amount
+            conn.execute(
+                "UPDATE jobs SET data = ?, updated_at = ? WHERE id = ?", (json.dumps(data), time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_job(self, job_id: str):
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def save_result(self, job_id: str, index: int, result: dict):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO results (job_id, idx, query, topic, data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, index, result.get("query", ""), normalize_topic(result.get("query", "")),
+             json.dumps(result), time.time())
+        )
+
+    def get_results(self, job_id: str) -> list:
+        rows = self._connection().execute(
+            "SELECT data FROM results WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def find_latest_result(self, query: str, exclude_job_id: str = None):
+        row = self._connection().execute(
+            "SELECT job_id, data FROM results WHERE topic = ? AND job_id != ? ORDER BY created_at DESC LIMIT 1",
+            (normalize_topic(query), exclude_job_id or "")
+        ).fetchone()
+        return (row["job_id"], json.loads(row["data"])) if row else None
+
+    def enqueue_topics(self, job_id: str, topics: list):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO tasks (job_id, idx, query, status) VALUES (?, ?, ?, ?)",
+                [(job_id, i, topic, PENDING) for i, topic in enumerate(topics)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim_task(self, worker_id: str, job_id: str = None):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Put tasks whose worker stopped renewing its lease back in the queue
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = NULL WHERE status = ? AND claimed_at < ?",
+                (PENDING, CLAIMED, now - self.lease_seconds)
+            )
+            if job_id is None:
+                row = conn.execute(
+                    "SELECT * FROM tasks WHERE status = ? ORDER BY id LIMIT 1", (PENDING,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT * FROM tasks WHERE status = ? AND job_id = ? ORDER BY id LIMIT 1", (PENDING, job_id)
+                ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, worker = ?, claimed_at = ? WHERE id = ?",
+                    (CLAIMED, worker_id, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return {"id": row["id"], "job_id": row["job_id"], "index": row["idx"], "query": row["query"], "worker": worker_id}
+
+    def renew_task(self, task: dict) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE tasks SET claimed_at = ? WHERE id = ? AND status = ? AND worker = ?",
+            (time.time(), task["id"], CLAIMED, task["worker"])
+        )
+        return cursor.rowcount == 1
+
+    def complete_task(self, task: dict, result: dict) -> bool:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ? WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, task["id"], CLAIMED, task["worker"])
+            )
+            owned = cursor.rowcount == 1
+            if owned:
+                self.save_result(task["job_id"], task["index"], result)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return owned
+
+    def fail_task(self, task: dict, error: str) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE tasks SET status = ?, error = ? WHERE id = ? AND status = ? AND worker = ?",
+            (FAILED, error, task["id"], CLAIMED, task["worker"])
+        )
+        return cursor.rowcount == 1
+
+    def get_tasks(self, job_id: str) -> list:
+        rows = self._connection().execute(
+            "SELECT idx, query, status, worker, error FROM tasks WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+        return [
+            {"index": row["idx"], "query": row["query"], "status": row["status"],
+             "worker": row["worker"], "error": row["error"]}
+            for row in rows
+        ]
+
+    def put_stage_result(self, key: str, result: dict, keep_seconds: float):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO stage_results (key, data, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(result), now)
+        )
+        conn.execute("DELETE FROM stage_results WHERE created_at < ?", (now - keep_seconds,))
+
+    def get_stage_result(self, key: str, max_age: float):
+        row = self._connection().execute(
+            "SELECT data FROM stage_results WHERE key = ? AND created_at >= ?", (key, time.time() - max_age)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def put_artifact(self, path: str, data) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        mode = "wb" if isinstance(data, bytes) else "w"
+        # Write to a temporary file first so readers on other workers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode) as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def get_artifact(self, path: str):
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def local_path(self, path: str):
+        return path if os.path.isfile(path) else None
+
+
+class LeaseRenewal:
+    """Renew a claimed task's lease in the background while it is being processed"""
+
+    def __init__(self, store: BaseStore, task: dict):
+        self.store = store
+        self.task = task
+        self.interval = max(store.lease_seconds / 3, 1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.loop, name=f"lease-{task['id']}", daemon=True)
+
+    def loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.store.renew_task(self.task):
+                    logger.warning(f"Lost the claim on topic task {self.task['id']} ({self.task['query']})")
+                    return
+            except Exception as e:
+                logger.error(f"Error renewing topic task {self.task['id']}: {str(e)}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# Store backends by name. A Redis/MinIO (or any other) implementation of BaseStore can be
+# registered here and selected with the NEWSPAPER_STORE environment variable.
+store_backends = {
+    "sqlite": lambda: SQLiteStore(
+        db_path=os.getenv("NEWSPAPER_STORE_PATH", "outputs/store.db"),
+        lease_seconds=int(os.getenv("NEWSPAPER_TASK_LEASE_SECONDS", "900"))
+    ),
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def register_store(name: str, factory):
+    """Register a store backend factory under a name usable in NEWSPAPER_STORE"""
+    store_backends[name] = factory
+
+
+def get_store() -> BaseStore:
+    """Return the process-wide store selected by NEWSPAPER_STORE (default: sqlite)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = os.getenv("NEWSPAPER_STORE", "sqlite")
+            if backend not in store_backends:
+                raise ValueError(f"Unknown store backend: {backend}")
+            _store = store_backends[backend]()
+        return _store
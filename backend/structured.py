@@ -0,0 +1,223 @@
+import re
+import json
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+import json5
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib parser is the fallback fast path
+    orjson = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How often each parse path and repair was needed, per process
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a model response cannot be parsed or repaired into the expected shape"""
+
+
+def count(event: str):
+    with _counts_lock:
+        _counts[event] += 1
+
+
+def counts() -> dict:
+    with _counts_lock:
+        return dict(_counts)
+
+
+THINK_BLOCK = re.compile(r"<think>.*?</think>", re.S)
+CODE_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+TRAILING_COMMA = re.compile(r",\s*([\]}])")
+
+
+def _extract_block(text: str):
+    """Return the outermost JSON object or array embedded in free text, if any"""
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]")
+    return text[start:end + 1] if end > start else None
+
+
+def loads(text: str):
+    """
+    Parse a model response as JSON: orjson/stdlib fast path, then repairs (reasoning blocks,
+    code fences, surrounding prose, trailing commas), then json5 as the last resort.
+    """
+    if text is None:
+        raise StructuredOutputError("Empty response")
+    try:
+        value = orjson.loads(text) if orjson is not None else json.loads(text)
+        count("json.fast")
+        return value
+    except ValueError:
+        pass
+
+    repaired = THINK_BLOCK.sub("", text).strip()
+    fence = CODE_FENCE.search(repaired)
+    if fence:
+        repaired = fence.group(1).strip()
+    block = _extract_block(repaired)
+    if block is not None:
+        repaired = block
+    repaired = TRAILING_COMMA.sub(r"\1", repaired)
+    try:
+        value = json.loads(repaired)
+        count("json.repaired")
+        return value
+    except ValueError:
+        pass
+
+    try:
+        value = json5.loads(repaired)
+        count("json.json5")
+        return value
+    except ValueError as e:
+        count("json.failed")
+        raise StructuredOutputError(f"Could not parse model response as JSON: {str(e)}")
+
+
+def _expect_object(value, name: str) -> dict:
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+        count(f"{name}.unwrapped_list")
+        value = value[0]
+    if not isinstance(value, dict):
+        count(f"{name}.invalid")
+        raise StructuredOutputError(f"Expected a JSON object for {name}, got {type(value).__name__}")
+    return value
+
+
+def _paragraphs(value, name: str, expected: int = 5) -> list:
+    """Coerce paragraphs to exactly `expected` strings, as the article template requires"""
+    if isinstance(value, str):
+        value = [p.strip() for p in re.split(r"\n\s*\n", value) if p.strip()]
+    if not isinstance(value, list):
+        count(f"{name}.invalid")
+        raise StructuredOutputError(f"Expected a list of paragraphs for {name}")
+    paragraphs = [p if isinstance(p, str) else str(p) for p in value if p]
+    if not paragraphs:
+        count(f"{name}.invalid")
+        raise StructuredOutputError(f"No paragraphs in {name}")
+    if len(paragraphs) > expected:
+        count(f"{name}.paragraphs_merged")
+        paragraphs = paragraphs[:expected - 1] + [" ".join(paragraphs[expected - 1:])]
+    elif len(paragraphs) < expected:
+        count(f"{name}.paragraphs_padded")
+        paragraphs = paragraphs + [""] * (expected - len(paragraphs))
+    return paragraphs
+
+
+def parse_draft(text: str) -> dict:
+    """WriterAgent.writer output: title, date, 5 paragraphs and a summary"""
+    draft = _expect_object(loads(text), "draft")
+    paragraphs = _paragraphs(draft.get("paragraphs"), "draft")
+    title = draft.get("title")
+    if not title:
+        count("draft.title_missing")
+        title = paragraphs[0].split(". ")[0][:100]
+    summary = draft.get("summary")
+    if not summary:
+        count("draft.summary_missing")
+        summary = paragraphs[0]
+    date = draft.get("date")
+    if not date:
+        count("draft.date_missing")
+        date = datetime.now().strftime('%d/%m/%Y')
+    return {"title": str(title), "date": str(date), "paragraphs": paragraphs, "summary": str(summary)}
+
+
+def parse_revision(text: str) -> dict:
+    """WriterAgent.revise output: 5 paragraphs and a message to the critique"""
+    revision = _expect_object(loads(text), "revision")
+    paragraphs = _paragraphs(revision.get("paragraphs"), "revision")
+    message = revision.get("message")
+    if message is None:
+        count("revision.message_missing")
+        message = ""
+    return {"paragraphs": paragraphs, "message": str(message)}
+
+
+def parse_url_list(text: str) -> list:
+    """CuratorAgent.curate_sources output: a list of URLs, possibly wrapped in an object"""
+    value = loads(text)
+    if isinstance(value, dict):
+        count("urls.unwrapped_object")
+        lists = [v for v in value.values() if isinstance(v, list)]
+        if not lists:
+            raise StructuredOutputError("No list of URLs in curator response")
+        value = lists[0]
+    if not isinstance(value, list):
+        raise StructuredOutputError("Expected a list of URLs")
+    urls = []
+    for item in value:
+        if isinstance(item, dict) and isinstance(item.get("url"), str):
+            count("urls.from_objects")
+            urls.append(item["url"])
+        elif isinstance(item, str):
+            urls.append(item)
+    return urls
+
+
+def parse_curated_content(text: str) -> dict:
+    """CuratorAgent.curate_content output: title and HTML content"""
+    result = _expect_object(loads(text), "curated")
+    if not result.get("content"):
+        count("curated.invalid")
+        raise StructuredOutputError("No content in curator response")
+    if not result.get("title"):
+        count("curated.title_missing")
+        result["title"] = "Untitled"
+    return {"title": str(result["title"]), "content": str(result["content"])}
+
+
+def parse_search_results(text: str) -> list:
+    """Search results: a list of sources with url, title and snippet (date defaults to today)"""
+    value = loads(text)
+    if isinstance(value, dict):
+        value = value.get("results")
+    if not isinstance(value, list):
+        raise StructuredOutputError("Invalid JSON structure: missing 'results' array")
+    results = []
+    for result in value:
+        if isinstance(result, dict) and all(result.get(k) for k in ["url", "title", "snippet"]):
+            # Ensure there's a date, even if approximate
+            if not result.get("date"):
+                count("search.date_missing")
+                result["date"] = datetime.now().strftime('%Y-%m-%d')
+            results.append(result)
+        else:
+            count("search.invalid_result")
+            logger.warning(f"Skipping invalid result: {result}")
+    return results
+
+
+def parse_intro_outro(text: str) -> dict:
+    """PodcastAgent.generate_intro_outro output: the episode's intro and outro lines"""
+    result = _expect_object(loads(text), "intro_outro")
+    if not result.get("intro") or not result.get("outro"):
+        count("intro_outro.invalid")
+        raise StructuredOutputError("Missing intro or outro in podcast response")
+    return {"intro": str(result["intro"]), "outro": str(result["outro"])}
+
+
+NO_FEEDBACK = {"none", "null", "no feedback", "no changes needed", "n/a"}
+
+
+def parse_critique(text: str):
+    """CritiqueAgent output: None when the article is accepted, otherwise the feedback"""
+    normalized = (text or "").strip().strip("\"'`*.").strip().lower()
+    if normalized in NO_FEEDBACK or not normalized:
+        if text != "None":
+            count("critique.verdict_normalized")
+        return None
+    return text.strip()
@@ -0,0 +1,88 @@
+import os
+import hashlib
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class AudioCache:
+    """
+    Disk-backed cache of synthesized speech segments, keyed by normalized text, voice and TTS model.
+
+    Entries are plain files, so several backend processes on the same host can share the cache.
+    When the cache grows beyond max_bytes the least recently used segments are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".mp3"))
+
+    def key(self, text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{voice}\n{normalize_text(text)}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark the segment as recently used
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".mp3")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        self._size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+        logger.info(f"Evicted TTS cache entries, cache size is now {self._size} bytes")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Return the process-wide audio segment cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache(
+                os.getenv("PODCAST_TTS_CACHE_DIR", "outputs/.tts_cache"),
+                int(os.getenv("PODCAST_TTS_CACHE_MB", "500")) * 1024 * 1024
+            )
+        return _cache
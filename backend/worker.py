@@ -0,0 +1,62 @@
+import os
+import socket
+import logging
+import threading
+
+from .store import get_store
+from .langgraph_agent import MasterAgent
+from .routing import ModelRouter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class TopicWorker:
+    """
+    Background threads that claim topic tasks of any job from the shared store queue.
+
+    Running these in every backend process lets the topics of one edition spread across all
+    uvicorn workers and nodes that share the store, not only the process that received the request.
+    """
+
+    def __init__(self, threads: int, poll_interval: float = 1.0):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.store = get_store()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.threads):
+            thread = threading.Thread(target=self.loop, name=f"topic-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.threads} topic worker threads")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def loop(self):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        while not self._stop.is_set():
+            try:
+                task = self.store.claim_task(worker_id)
+            except Exception as e:
+                logger.error(f"Error claiming topic task: {str(e)}")
+                task = None
+            if task is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                job = self.store.get_job(task["job_id"]) or {}
+                master_agent = MasterAgent(
+                    run_id=task["job_id"], store=self.store, incremental=job.get("incremental", False),
+                    router=ModelRouter.for_job(job, self.store)
+                )
+                master_agent.process_task(task)
+            except Exception as e:
+                # The task's lease expires and it is claimed again; keep this thread serving the queue
+                logger.error(f"Error processing topic task {task['id']}: {str(e)}")
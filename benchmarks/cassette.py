@@ -0,0 +1,225 @@
+"""
+Record/replay proxy for the agents' OpenAI and Perplexity traffic.
+
+In record mode the proxy forwards every chat completions and audio speech request to the real
+APIs and appends the request, response and upstream latency to a cassette file (one JSON line
+per call). In replay mode it serves the recorded responses back, with the original latency
+multiplied by --latency-scale (0 answers immediately), so benchmark runs see exactly the same
+upstream behaviour, including the number of critique rounds, on every commit.
+
+    python -m benchmarks.cassette record --cassette cassettes/baseline.jsonl
+    python -m benchmarks.cassette replay --cassette cassettes/baseline.jsonl --latency-scale 1.0
+
+The backend is pointed at the proxy the same way as at the mock server (see mock_server.py).
+Requests are matched on their endpoint and body with dates blanked out, so a cassette recorded
+on one day still replays on the next. A request that was not recorded verbatim falls back to a
+call of the same agent (endpoint, model and system prompt); such fallback hits are counted and
+reported separately, as the replay is then no longer exact.
+"""
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import logging
+import threading
+from collections import defaultdict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = {
+    "/openai": os.getenv("CASSETTE_OPENAI_UPSTREAM", "https://api.openai.com"),
+    "/perplexity": os.getenv("CASSETTE_PERPLEXITY_UPSTREAM", "https://api.perplexity.ai"),
+}
+
+DATE_PATTERN = re.compile(r"\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2}")
+
+
+def request_key(path: str, body: dict) -> str:
+    """Match key of a request: its endpoint and body, ignoring dates"""
+    canonical = DATE_PATTERN.sub("<date>", json.dumps(body, sort_keys=True))
+    return hashlib.sha256(f"{path}\n{canonical}".encode()).hexdigest()
+
+
+def fallback_key(path: str, body: dict) -> str:
+    """
+    Looser key used when a request was not recorded verbatim: endpoint, model and the system
+    prompt, which identifies the agent (several agents use the same model), or the TTS voice
+    """
+    system = [m.get("content") for m in body.get("messages") or [] if m.get("role") == "system"]
+    agent = DATE_PATTERN.sub("<date>", json.dumps(system)) if system else body.get("voice")
+    digest = hashlib.sha256(str(agent).encode()).hexdigest()[:16]
+    return f"{path}\n{body.get('model')}\n{digest}"
+
+
+class Cassette:
+    """Recorded upstream calls, queued per request key in recording order"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = []
+        self._by_key = defaultdict(deque)
+        self._by_fallback = defaultdict(deque)
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    self.add(json.loads(line))
+        logger.info(f"Loaded {len(self.entries)} recorded calls from {self.path}")
+        return self
+
+    def add(self, entry: dict):
+        self.entries.append(entry)
+        self._by_key[entry["key"]].append(entry)
+        # Recomputed, so cassettes recorded with an older fallback key still load
+        self._by_fallback[fallback_key(entry["path"], entry["request"])].append(entry)
+
+    def record(self, entry: dict):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.add(entry)
+
+    def match(self, key: str, fallback: str):
+        """
+        Return (entry, exact) for the next recorded call for this request, repeating the last one
+        once exhausted, or (None, False)
+        """
+        with self._lock:
+            for index, queue, exact in ((key, self._by_key, True), (fallback, self._by_fallback, False)):
+                pending = queue[index]
+                while pending and pending[0].get("served"):
+                    pending.popleft()
+                if pending:
+                    entry = pending.popleft()
+                    entry["served"] = True
+                    self._last[index] = entry
+                    return entry, exact
+                if index in self._last:
+                    return self._last[index], exact
+        return None, False
+
+
+class CassetteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cassette: Cassette, mode: str, latency_scale: float = 1.0):
+        super().__init__(address, CassetteHandler)
+        self.cassette = cassette
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.started = time.time()
+        self.request_count = 0
+        self.exact_hits = 0
+        self.fallback_hits = 0
+        self.misses = 0
+        self._count_lock = threading.Lock()
+
+    def forward(self, path: str, raw: bytes, headers) -> tuple:
+        for prefix, upstream in UPSTREAMS.items():
+            if path.startswith(prefix):
+                url = upstream + path[len(prefix):]
+                break
+        else:
+            return 404, "application/json", b'{"error": {"message": "Unknown upstream"}}'
+        forwarded = {k: v for k, v in headers.items() if k.lower() in ("authorization", "content-type", "accept")}
+        response = requests.post(url, data=raw, headers=forwarded, timeout=600)
+        return response.status_code, response.headers.get("Content-Type", "application/json"), response.content
+
+    def respond(self, path: str, raw: bytes, headers) -> tuple:
+        """Return (status, content type, payload bytes) for an API request"""
+        body = json.loads(raw or b"{}")
+        key, fallback = request_key(path, body), fallback_key(path, body)
+
+        if self.mode == "record":
+            start = time.time()
+            status, content_type, payload = self.forward(path, raw, headers)
+            latency = time.time() - start
+            self.cassette.record({
+                "key": key,
+                "fallback_key": fallback,
+                "path": path,
+                "request": body,
+                "status": status,
+                "content_type": content_type,
+                "response": base64.b64encode(payload).decode(),
+                "offset": start - self.started,
+                "latency": latency,
+            })
+            return status, content_type, payload
+
+        entry, exact = self.cassette.match(key, fallback)
+        with self._count_lock:
+            if entry is None:
+                self.misses += 1
+            elif exact:
+                self.exact_hits += 1
+            else:
+                self.fallback_hits += 1
+        if entry is None:
+            logger.warning(f"No recorded call for {path} ({body.get('model')})")
+            return 500, "application/json", b'{"error": {"message": "No recorded response", "type": "server_error"}}'
+        if not exact:
+            logger.warning(f"Replaying a fallback match for {path} ({body.get('model')}), the request was not recorded verbatim")
+        time.sleep(entry["latency"] * self.latency_scale)
+        return entry["status"], entry["content_type"], base64.b64decode(entry["response"])
+
+
+class CassetteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        with self.server._count_lock:
+            self.server.request_count += 1
+        status, content_type, payload = self.server.respond(self.path, raw, self.headers)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def create_server(mode: str, cassette_path: str, host: str = "127.0.0.1", port: int = 8765,
+                  latency_scale: float = 1.0) -> CassetteServer:
+    cassette = Cassette(cassette_path)
+    if mode == "replay":
+        cassette.load()
+    return CassetteServer((host, port), cassette, mode, latency_scale)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record/replay proxy for OpenAI and Perplexity traffic")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", default=f"cassettes/run_{int(time.time())}.jsonl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latencies in replay")
+    return parser
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args()
+    server = create_server(args.mode, args.cassette, args.host, args.port, args.latency_scale)
+    logger.info(f"Cassette proxy ({args.mode}: {args.cassette}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the OpenAI and Perplexity APIs used by the agents.
+
+Serves the chat completions endpoint under /openai/v1 and /perplexity and the audio speech
+endpoint under /openai/v1, answering each agent's prompt with a well-formed canned response
+after a configurable latency, and failing a configurable fraction of requests.
+
+    python -m benchmarks.mock_server --port 8765 --chat-latency lognormal:800:0.4 --error-rate 0.01
+
+Point the backend at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/openai/v1
+    OPENAI_API_BASE=http://127.0.0.1:8765/openai/v1
+    PERPLEXITY_BASE_URL=http://127.0.0.1:8765/perplexity
+"""
+import re
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Latency:
+    """Latency distribution parsed from 'fixed:MS', 'uniform:MIN:MAX', 'normal:MEAN:STD' or 'lognormal:MEDIAN:SIGMA'"""
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Return a latency in seconds"""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = random.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = random.lognormvariate(0, sigma) * median
+        return max(ms, 0) / 1000
+
+
+def chat_completion(model: str, content: str, messages: list = ()) -> dict:
+    # Roughly four characters per token, so that routing sees plausible costs
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def mock_sources(query: str, count: int) -> list:
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+    today = datetime.now().strftime("%Y-%m-%d")
+    return [
+        {
+            "url": f"https://news.example.com/{slug}/{i}",
+            "title": f"{query}: development {i}",
+            "snippet": f"Snippet {i} about {query}. " * 4,
+            "date": today
+        }
+        for i in range(count)
+    ]
+
+
+class MockResponder:
+    """Builds canned responses for each agent's prompt"""
+
+    def __init__(self, sources: int = 20, revise_rate: float = 0.0):
+        self.sources = sources
+        self.revise_rate = revise_rate
+
+    def perplexity(self, messages: list) -> str:
+        query = messages[-1]["content"].split("about: ", 1)[-1].split("\n", 1)[0]
+        results = mock_sources(query, self.sources)
+        return f"<think>Searching for {query}.</think>\nHere are the results:\n{json.dumps({'results': results})}"
+
+    def openai(self, messages: list) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        if "JSON extractor" in system:
+            match = re.search(r"\{.*\}", user, re.S)
+            return match.group(0) if match else json.dumps({"results": []})
+        if "personal newspaper editor" in system:
+            urls = re.findall(r'"url": "([^"]+)"', user)
+            return json.dumps(urls[:10])
+        if "news curator" in system:
+            return json.dumps({"title": "Curated story", "content": "<p>Curated content.</p>" * 5})
+        if "newspaper writer" in system:
+            query = re.search(r"Query or Topic: (.*?)(\[|\n|$)", user)
+            topic = query.group(1).strip() if query else "the news"
+            return json.dumps({
+                "title": f"What is new in {topic}",
+                "date": datetime.now().strftime("%d/%m/%Y"),
+                "paragraphs": [f"Paragraph {i + 1} about {topic}. " * 6 for i in range(5)],
+                "summary": f"A summary of the latest on {topic}. It covers five developments."
+            })
+        if "newspaper editor" in system:
+            return json.dumps({
+                "paragraphs": [f"Revised paragraph {i + 1}. " * 6 for i in range(5)],
+                "message": "Applied the requested changes."
+            })
+        if "critique" in system:
+            return "Tighten the introduction." if random.random() < self.revise_rate else "None"
+        if "GPT Podcast" in system and "'intro' and 'outro'" in user:
+            return json.dumps({
+                "intro": "ALEX: Welcome to GPT Podcast!\nLIA: Here is what we have today.",
+                "outro": "RAY: That's all for today.\nALEX: Thanks for listening to GPT Podcast!"
+            })
+        if "GPT Podcast" in system:
+            lines = ["ALEX: Welcome to GPT Podcast!"]
+            for i in range(12):
+                host = ["LIA", "RAY", "ALEX"][i % 3]
+                lines.append(f"{host}: Point {i + 1} about today's stories, and why it matters.")
+            return "\n".join(lines)
+        return "None"
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, responder: MockResponder, latencies: dict, error_rate: float = 0.0):
+        super().__init__(address, MockHandler)
+        self.responder = responder
+        self.latencies = latencies
+        self.error_rate = error_rate
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def respond(self, path: str, body: dict):
+        """Return (status, content type, payload bytes, latency seconds) for an API request"""
+        if path.startswith("/perplexity") and path.endswith("/chat/completions"):
+            kind = "search"
+            messages = body.get("messages", [])
+            payload = chat_completion(body.get("model"), self.responder.perplexity(messages), messages)
+        elif path.startswith("/openai") and path.endswith("/chat/completions"):
+            kind = "chat"
+            messages = body.get("messages", [])
+            payload = chat_completion(body.get("model"), self.responder.openai(messages), messages)
+        elif path.startswith("/openai") and path.endswith("/audio/speech"):
+            kind = "tts"
+            # Roughly the size of real speech audio, so downstream I/O is realistic
+            audio = b"ID3" + b"\x00" * (40 * len(body.get("input", "")))
+            return 200, "audio/mpeg", audio, self.latencies[kind].sample()
+        else:
+            return 404, "application/json", b'{"error": {"message": "Not found"}}', 0
+        return 200, "application/json", json.dumps(payload).encode(), self.latencies[kind].sample()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        body = json.loads(raw or b"{}")
+        with self.server._count_lock:
+            self.server.request_count += 1
+
+        status, content_type, payload, latency = self.server.respond(self.path, body)
+        time.sleep(latency)
+        if status == 200 and random.random() < self.server.error_rate:
+            status, content_type = 500, "application/json"
+            payload = b'{"error": {"message": "Injected mock error", "type": "server_error"}}'
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--chat-latency", default="lognormal:600:0.4", help="OpenAI chat completions latency")
+    parser.add_argument("--search-latency", default="lognormal:3000:0.5", help="Perplexity search latency")
+    parser.add_argument("--tts-latency", default="lognormal:2000:0.3", help="Audio speech latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--sources", type=int, default=20, help="Search results returned per topic")
+    parser.add_argument("--revise-rate", type=float, default=0.0, help="Fraction of critiques asking for a revision")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Perplexity server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    return add_mock_arguments(parser)
+
+
+def create_server(args) -> MockServer:
+    if args.seed is not None:
+        random.seed(args.seed)
+    latencies = {
+        "chat": Latency(args.chat_latency),
+        "search": Latency(args.search_latency),
+        "tts": Latency(args.tts_latency),
+    }
+    responder = MockResponder(sources=args.sources, revise_rate=args.revise_rate)
+    return MockServer((args.host, args.port), responder, latencies, args.error_rate)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args()
+    server = create_server(args)
+    logger.info(f"Mock server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
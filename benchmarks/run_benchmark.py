@@ -0,0 +1,299 @@
+"""
+Offline benchmark of the newspaper pipeline against the local mock server.
+
+Runs MasterAgent.run directly ("pipeline" mode) or POSTs to /generate_newspaper on a backend
+server ("http" mode) for every combination of topic count and concurrency, and reports
+throughput, p50/p95/p99 edition latency, the peak RSS of the process doing the work and the
+memory each in-flight edition adds on top of the process baseline.
+
+    python -m benchmarks.run_benchmark --mode pipeline --topics 1,10,100 --concurrency 1,8 --requests 16
+    python -m benchmarks.run_benchmark --mode http --topics 5 --concurrency 1,10,50 --chat-latency fixed:50
+
+With --record the upstream calls go to the real APIs and are saved to a cassette; with --replay
+a recorded cassette is served instead of the mock, so runs are reproducible across commits
+(see cassette.py).
+
+Every scenario runs in a fresh process inside a temporary working directory, so the numbers
+do not leak between scenarios and nothing is written to the repository's outputs/.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import cassette
+from .mock_server import add_mock_arguments, create_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def proc_status_mb(pid, field: str):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb(pid: int = None):
+    """Peak resident set size of a process in MB (this process if pid is None)"""
+    if pid is None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    return proc_status_mb(pid, "VmHWM")
+
+
+def current_rss_mb(pid="self"):
+    """Current resident set size of a process in MB (Linux only)"""
+    return proc_status_mb(pid, "VmRSS")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def topic_tag(*numbers) -> str:
+    """A distinct word per topic (e.g. 'tbxc'): numbers and short tokens are not searchable terms"""
+    return "t" + "x".join("".join(chr(ord("a") + int(d)) for d in str(n)) for n in numbers)
+
+
+def edition_topics(edition: int, topics: int, shared: bool) -> list:
+    # Topics only share the word 'benchmark', so they never match each other's indexed sources
+    if shared:
+        return [f"Benchmark {topic_tag(i)}" for i in range(topics)]
+    return [f"Benchmark {topic_tag(edition, i)}" for i in range(topics)]
+
+
+def run_editions(generate, topics: int, concurrency: int, requests_count: int, shared: bool) -> dict:
+    """Run requests_count editions with the given concurrency and collect latencies"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(edition):
+        start = time.perf_counter()
+        try:
+            generate(edition_topics(edition, topics, shared))
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests_count)))
+    return {"wall": time.perf_counter() - start, "latencies": latencies, "errors": errors}
+
+
+def pipeline_child(args):
+    """Scenario body for pipeline mode, run in its own process; prints a JSON result"""
+    sys.path.insert(0, REPO_ROOT)
+    from backend.langgraph_agent import MasterAgent
+
+    def generate(queries):
+        return MasterAgent().run(queries, args.layout)
+
+    baseline = current_rss_mb()
+    result = run_editions(generate, args.topics[0], args.concurrency[0], args.requests, args.shared_topics)
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["baseline_rss_mb"] = baseline
+    print(json.dumps(result))
+
+
+def scenario_env(mock_url: str, workdir: str, real_keys: bool = False, source_index: bool = False) -> dict:
+    env = dict(os.environ)
+    if not real_keys:
+        env.update({"OPENAI_API_KEY": "mock", "PERPLEXITY_API_KEY": "mock"})
+    env.update({
+        "OPENAI_BASE_URL": f"{mock_url}/openai/v1",
+        "OPENAI_API_BASE": f"{mock_url}/openai/v1",
+        "PERPLEXITY_BASE_URL": f"{mock_url}/perplexity",
+        "NEWSPAPER_STORE_PATH": os.path.join(workdir, "outputs", "store.db"),
+        # The local source index makes results depend on earlier editions and on timing; off unless asked for
+        "NEWSPAPER_SOURCE_INDEX": "1" if source_index else "0",
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")])),
+    })
+    return env
+
+
+def run_pipeline_scenario(args, topics, concurrency, mock_url, workdir) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.run_benchmark", "--child",
+        "--topics", str(topics), "--concurrency", str(concurrency),
+        "--requests", str(args.requests), "--layout", args.layout,
+    ]
+    if args.shared_topics:
+        command.append("--shared-topics")
+    completed = subprocess.run(
+        command, cwd=workdir, env=scenario_env(mock_url, workdir, bool(args.record), args.source_index),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL if not args.verbose else None, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Pipeline scenario failed with exit code {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_http_scenario(args, topics, concurrency, mock_url, workdir) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.server:backend_app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=scenario_env(mock_url, workdir, bool(args.record), args.source_index),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url, timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.2)
+
+        def generate(queries):
+            response = requests.post(f"{base_url}/generate_newspaper", json={"topics": queries, "layout": args.layout})
+            response.raise_for_status()
+            return response.json()
+
+        baseline = current_rss_mb(server.pid)
+        result = run_editions(generate, topics, concurrency, args.requests, args.shared_topics)
+        result["peak_rss_mb"] = peak_rss_mb(server.pid)
+        result["baseline_rss_mb"] = baseline
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def args_requests(result) -> int:
+    return len(result["latencies"]) + len(result["errors"])
+
+
+def summarize(mode, topics, concurrency, result) -> dict:
+    latencies = result["latencies"]
+    wall = result["wall"]
+    peak, baseline = result.get("peak_rss_mb"), result.get("baseline_rss_mb")
+    # Memory added at peak by each edition in flight
+    per_edition = (peak - baseline) / min(concurrency, args_requests(result)) \
+        if peak is not None and baseline is not None and latencies else None
+    return {
+        "mode": mode,
+        "topics": topics,
+        "concurrency": concurrency,
+        "editions": len(latencies),
+        "errors": len(result["errors"]),
+        "editions_per_s": len(latencies) / wall if wall else 0,
+        "topics_per_s": len(latencies) * topics / wall if wall else 0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+        "peak_rss_mb": peak,
+        "mb_per_edition": per_edition,
+    }
+
+
+def print_report(rows: list):
+    header = f"{'mode':<9}{'topics':>7}{'conc':>6}{'ok':>5}{'err':>5}{'ed/s':>9}{'topics/s':>10}" \
+             f"{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'peak RSS MB':>13}{'MB/edition':>12}"
+    print(header)
+    print("-" * len(header))
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "n/a"
+
+    for row in rows:
+        print(f"{row['mode']:<9}{row['topics']:>7}{row['concurrency']:>6}{row['editions']:>5}{row['errors']:>5}"
+              f"{fmt(row['editions_per_s'], '.2f'):>9}{fmt(row['topics_per_s'], '.2f'):>10}"
+              f"{fmt(row['p50_s'], '.2f'):>9}{fmt(row['p95_s'], '.2f'):>9}{fmt(row['p99_s'], '.2f'):>9}"
+              f"{fmt(row['peak_rss_mb'], '.1f'):>13}{fmt(row['mb_per_edition'], '.1f'):>12}")
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline newspaper pipeline benchmark")
+    parser.add_argument("--mode", choices=["pipeline", "http"], default="pipeline")
+    parser.add_argument("--topics", type=int_list, default=[1, 10], help="Comma-separated topic counts per edition")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4], help="Comma-separated concurrent editions")
+    parser.add_argument("--requests", type=int, default=4, help="Editions per scenario")
+    parser.add_argument("--layout", default="layout_1.html")
+    parser.add_argument("--shared-topics", action="store_true", help="Use the same topics in every edition")
+    parser.add_argument("--source-index", action="store_true", help="Enable the local source index (off by default)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show backend logs")
+    parser.add_argument("--record", metavar="CASSETTE", help="Call the real APIs and record them to this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve upstream calls from this recorded cassette")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for replayed latencies")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return add_mock_arguments(parser)
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.child:
+        pipeline_child(args)
+        return
+
+    args.host, args.port = "127.0.0.1", free_port()
+    if args.record or args.replay:
+        mock = cassette.create_server(
+            "record" if args.record else "replay", args.record or args.replay,
+            args.host, args.port, args.latency_scale
+        )
+    else:
+        mock = create_server(args)
+    threading.Thread(target=mock.serve_forever, daemon=True).start()
+    mock_url = f"http://{args.host}:{args.port}"
+
+    rows = []
+    for topics in args.topics:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory(prefix="newspaper-bench-") as workdir:
+                if args.mode == "pipeline":
+                    result = run_pipeline_scenario(args, topics, concurrency, mock_url, workdir)
+                else:
+                    result = run_http_scenario(args, topics, concurrency, mock_url, workdir)
+            rows.append(summarize(args.mode, topics, concurrency, result))
+            print(f"Finished {args.mode} scenario: {topics} topics, concurrency {concurrency}", file=sys.stderr)
+
+    mock.shutdown()
+    print()
+    print_report(rows)
+    print(f"\nUpstream requests served by the mock: {mock.request_count}")
+    if args.replay:
+        print(f"Replayed exactly: {mock.exact_hits}, from a fallback match of the same agent: {mock.fallback_hits}, "
+              f"without a recorded response: {mock.misses}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
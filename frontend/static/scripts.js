@@ -1,5 +1,65 @@
 let selectedLayout = 'layout_1.html'; // Default layout
 
+// Topics are prefetched (searched and curated) by the backend while the form is being filled in
+const clientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+const prefetchedTopics = {}; // input id -> topic being prefetched
+const prefetchTimers = {};
+const PREFETCH_DELAY_MS = 1000;
+
+async function postPrefetch(path, topic) {
+    try {
+        const response = await fetch('http://localhost:9000' + path, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({ topic: topic, client_id: clientId })
+        });
+        return response.ok;
+    } catch (error) {
+        // Prefetching is best effort, generating the newspaper does not depend on it
+        console.log('Prefetch request failed:', error);
+        return false;
+    }
+}
+
+function cancelPrefetch(inputId) {
+    const topic = prefetchedTopics[inputId];
+    if (topic) {
+        delete prefetchedTopics[inputId];
+        postPrefetch('/prefetch/cancel', topic);
+    }
+}
+
+async function prefetchTopic(input) {
+    clearTimeout(prefetchTimers[input.id]);
+    const topic = input.value.trim();
+    if (prefetchedTopics[input.id] === topic) {
+        return;
+    }
+    cancelPrefetch(input.id);
+    if (topic) {
+        prefetchedTopics[input.id] = topic;
+        if (!await postPrefetch('/prefetch', topic) && prefetchedTopics[input.id] === topic) {
+            delete prefetchedTopics[input.id];
+        }
+    }
+}
+
+function onTopicInput(event) {
+    const input = event.target;
+    if (!input.classList.contains('inputText')) {
+        return;
+    }
+    clearTimeout(prefetchTimers[input.id]);
+    if (event.type === 'change') {
+        prefetchTopic(input);
+    } else {
+        prefetchTimers[input.id] = setTimeout(() => prefetchTopic(input), PREFETCH_DELAY_MS);
+    }
+}
+
 function selectLayout(event) {
     document.querySelectorAll('.layout-icon').forEach(icon => {
         icon.classList.remove('selected');
@@ -113,6 +173,8 @@ let topicCount = 1;
 
 window.addEventListener('DOMContentLoaded', async (event) => {
     document.getElementById('produceNewspaper').addEventListener('click', produceNewspaper);
+    document.getElementById('topicForm').addEventListener('input', onTopicInput);
+    document.getElementById('topicForm').addEventListener('change', onTopicInput);
     document.querySelectorAll('.layout-icon').forEach(icon => {
         icon.addEventListener('click', selectLayout);
     });
@@ -173,6 +235,11 @@ function addTopicField() {
 function removeTopicField(event) {
     const topicGroup = event.target.parentElement;
     if (topicGroup && topicGroup.id !== 'topicGroup1') {
+        const input = topicGroup.querySelector('.inputText');
+        if (input) {
+            clearTimeout(prefetchTimers[input.id]);
+            cancelPrefetch(input.id);
+        }
         topicGroup.remove();
         topicCount--;
         addIconToLastTopic();